@@ -1,10 +1,10 @@
 from django.contrib import admin
-from .models import Post, Comment
+from .models import Post, Comment, Tag, ImportJob
 
 
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
-    list_display = ['title', 'author', 'category', 'created_at', 'is_published']
+    list_display = ['title', 'author', 'category', 'created_at', 'is_published', 'comment_count']
     list_filter = ['is_published', 'created_at', 'category']
     search_fields = ['title', 'content', 'tags']
     date_hierarchy = 'created_at'
@@ -19,3 +19,21 @@ class CommentAdmin(admin.ModelAdmin):
     date_hierarchy = 'created_at'
     ordering = ['-created_at']
     raw_id_fields = ['post', 'parent']
+
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ['name', 'post_count']
+    search_fields = ['name']
+    readonly_fields = ['post_count']
+    ordering = ['-post_count', 'name']
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ['original_name', 'created_by', 'status', 'processed_files', 'total_files',
+                    'created_count', 'skipped_count', 'failed_count', 'created_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+    readonly_fields = ['total_files', 'processed_files', 'created_count', 'skipped_count',
+                       'failed_count', 'errors', 'started_at', 'finished_at']
+    ordering = ['-created_at']
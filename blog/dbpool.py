@@ -0,0 +1,20 @@
+"""
+数据库连接池统计
+连接池由psycopg_pool维护（见settings中的DB_POOL），每个进程各有一个，统计数据也是当前进程的
+"""
+from django.db import connections
+
+
+def pool_stats(reset=False):
+    """
+    返回各数据库别名的连接池统计，未启用连接池的别名不包含在内
+    统计项见psycopg_pool的get_stats()：pool_size、pool_available、requests_waiting、
+    requests_wait_ms、connections_num、connections_ms、returns_bad等
+    reset为True时同时清零累计的计数，便于按时间段采集
+    """
+    stats = {}
+    for alias in connections:
+        pool = getattr(connections[alias], 'pool', None)
+        if pool is not None:
+            stats[alias] = pool.pop_stats() if reset else pool.get_stats()
+    return stats
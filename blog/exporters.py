@@ -0,0 +1,140 @@
+"""
+文章导出
+导入（importers.py）的反向操作：把文章导出为带frontmatter的Markdown文件（title、tags、category、summary，
+与导入时读取的字段相同，导出的压缩包可以直接重新上传导入），打包为ZIP
+
+文章按主键分批读取（服务器端游标），ZIP逐个文件压缩后立即输出，
+ZIP目录所需的每个文件的元数据暂存在临时文件中，内存中只保留当前一篇文章，与文章总数无关
+"""
+import pickle
+import re
+import tempfile
+import zipfile
+
+import frontmatter
+from django.utils import timezone
+
+from .models import Post
+
+
+ITERATOR_CHUNK_SIZE = 200
+# 输出的数据积累到这个大小再发送，避免每篇文章一次很小的写入
+STREAM_CHUNK_SIZE = 64 * 1024
+MAX_FILENAME_TITLE = 80
+
+# 文件名中不允许的字符（Windows和类Unix系统的并集）以及控制字符
+UNSAFE_FILENAME_RE = re.compile(r'[\\/:*?"<>|\x00-\x1f]+')
+
+
+def post_filename(post):
+    """导出的文件名：<id>-<标题>.md，加上id避免标题相同的文章互相覆盖"""
+    title = UNSAFE_FILENAME_RE.sub('_', post.title).strip(' ._')[:MAX_FILENAME_TITLE]
+    return f'{post.pk}-{title}.md' if title else f'{post.pk}.md'
+
+
+def post_to_markdown(post):
+    """文章转换为带frontmatter的Markdown文本"""
+    metadata = {'title': post.title}
+    for field in ('tags', 'category', 'summary'):
+        value = getattr(post, field)
+        if value:
+            metadata[field] = value
+    if not post.is_published:
+        # 重新导入时仍为草稿
+        metadata['draft'] = True
+    return frontmatter.dumps(frontmatter.Post(post.content, **metadata), sort_keys=False) + '\n'
+
+
+def export_queryset():
+    return Post.objects.only('id', 'title', 'tags', 'category', 'summary', 'content', 'is_published', 'created_at')
+
+
+class StreamBuffer:
+    """
+    只写的文件对象：ZipFile写入的数据暂存在这里，由生成器分块取走后清空
+    关闭压缩包时一次写入整个ZIP目录，超过一定大小的数据转存到临时文件
+    不提供tell/seek，ZipFile按不可回退的输出处理
+    """
+
+    def __init__(self):
+        self.file = tempfile.SpooledTemporaryFile(max_size=STREAM_CHUNK_SIZE * 4)
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+        return self.file.write(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        self.file.seek(0)
+        while chunk := self.file.read(STREAM_CHUNK_SIZE):
+            yield chunk
+        self.file.seek(0)
+        self.file.truncate()
+        self.size = 0
+
+    def close(self):
+        self.file.close()
+
+
+class SpooledInfoList:
+    """
+    代替ZipFile.filelist：每个文件的ZipInfo写入临时文件，关闭压缩包写入目录时再按顺序读回
+    ZipFile只对filelist调用append、len和迭代
+    """
+
+    def __init__(self):
+        self.file = tempfile.TemporaryFile()
+        self.count = 0
+
+    def append(self, info):
+        pickle.dump(info, self.file, pickle.HIGHEST_PROTOCOL)
+        self.count += 1
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        self.file.seek(0)
+        for _ in range(self.count):
+            yield pickle.load(self.file)
+
+    def close(self):
+        self.file.close()
+
+
+class NoNameIndex(dict):
+    """代替ZipFile.NameToInfo：不保留文件名索引（只用于重名检查，导出的文件名带id，不会重复）"""
+
+    def __setitem__(self, key, value):
+        pass
+
+
+def iter_zip(posts=None):
+    """
+    逐块产出ZIP压缩包的内容，每篇文章一个Markdown文件
+    输出不可回退，ZipFile会在每个文件后写入数据描述符，不需要先把压缩包写入临时文件
+    """
+    if posts is None:
+        posts = export_queryset()
+
+    buffer = StreamBuffer()
+    infos = SpooledInfoList()
+    try:
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.filelist = infos
+            archive.NameToInfo = NoNameIndex()
+            for post in posts.order_by('pk').iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+                created_at = timezone.localtime(post.created_at)
+                info = zipfile.ZipInfo(post_filename(post), date_time=created_at.timetuple()[:6])
+                info.compress_type = zipfile.ZIP_DEFLATED
+                archive.writestr(info, post_to_markdown(post))
+                if buffer.size >= STREAM_CHUNK_SIZE:
+                    yield from buffer.drain()
+        # 关闭时写入的ZIP目录
+        yield from buffer.drain()
+    finally:
+        infos.close()
+        buffer.close()
@@ -0,0 +1,141 @@
+"""
+RSS/Atom订阅
+全部文章、按标签和按分类的订阅各有RSS和Atom两种格式，条目内容使用保存时预渲染的HTML
+订阅和整页缓存使用同一套机制（见pagecache.py）：属于feeds分组，只在文章变化时重新生成，
+并提供ETag/Last-Modified，订阅客户端定时轮询时内容未变化直接返回304
+"""
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.http import urlencode
+
+from .models import Post, Tag
+from .pagecache import FEED_GROUP, cache_anonymous_page, conditional_page
+from .routers import read_from_replica
+
+
+DEFAULT_ITEMS = 20
+# 订阅只在文章变化时失效，缓存时间可以比普通页面长得多
+DEFAULT_TIMEOUT = 60 * 60 * 24
+
+
+class PostFeed(Feed):
+    """全部已发布文章的RSS订阅"""
+    title = '我的博客'
+    description = '最新发布的博客文章'
+
+    def link(self):
+        return reverse('post_list')
+
+    def published_posts(self, obj):
+        return Post.objects.filter(is_published=True)
+
+    def items(self, obj):
+        count = getattr(settings, 'BLOG_FEED_ITEMS', DEFAULT_ITEMS)
+        return self.published_posts(obj).for_feed().order_by('-created_at', '-id')[:count]
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        # 旧数据可能尚未预渲染，此时退回列表摘要
+        return item.content_html or item.excerpt
+
+    def item_link(self, item):
+        return reverse('post_detail', args=[item.pk])
+
+    def item_pubdate(self, item):
+        return item.created_at
+
+    def item_updateddate(self, item):
+        return item.updated_at
+
+    def item_author_name(self, item):
+        return item.author.username
+
+    def item_categories(self, item):
+        return [item.category, *item.tag_list] if item.category else item.tag_list
+
+    def __call__(self, request, *args, **kwargs):
+        response = super().__call__(request, *args, **kwargs)
+        # Feed按最新文章的发布时间设置Last-Modified，这里去掉，由conditional_page按缓存版本统一设置，
+        # 与ETag一致，编辑旧文章后轮询的客户端也能拿到新内容
+        del response['Last-Modified']
+        return response
+
+
+class AtomPostFeed(PostFeed):
+    """全部已发布文章的Atom订阅"""
+    feed_type = Atom1Feed
+    subtitle = PostFeed.description
+
+
+class TagFeed(PostFeed):
+    """某个标签下已发布文章的RSS订阅"""
+
+    def get_object(self, request, name):
+        return get_object_or_404(Tag, name=name)
+
+    def title(self, obj):
+        return f'我的博客 - #{obj.name}'
+
+    def description(self, obj):
+        return f'标签“{obj.name}”下最新发布的博客文章'
+
+    def link(self, obj):
+        return f'{reverse("tag_cloud")}?{urlencode({"tag": obj.name})}'
+
+    def published_posts(self, obj):
+        return obj.posts.filter(is_published=True)
+
+
+class AtomTagFeed(TagFeed):
+    """某个标签下已发布文章的Atom订阅"""
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
+
+
+class CategoryFeed(PostFeed):
+    """某个分类下已发布文章的RSS订阅"""
+
+    def get_object(self, request, name):
+        if not Post.objects.filter(is_published=True, category=name).exists():
+            raise Http404('分类不存在')
+        return name
+
+    def title(self, obj):
+        return f'我的博客 - {obj}'
+
+    def description(self, obj):
+        return f'分类“{obj}”下最新发布的博客文章'
+
+    def published_posts(self, obj):
+        return Post.objects.filter(is_published=True, category=obj)
+
+
+class AtomCategoryFeed(CategoryFeed):
+    """某个分类下已发布文章的Atom订阅"""
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
+
+
+def feed_view(feed_class):
+    """订阅视图：从副本读取，匿名请求整页缓存并支持条件请求"""
+    timeout = getattr(settings, 'BLOG_FEED_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+    view = cache_anonymous_page(FEED_GROUP, timeout=timeout)(feed_class())
+    return read_from_replica(conditional_page(FEED_GROUP)(view))
+
+
+post_feed = feed_view(PostFeed)
+atom_post_feed = feed_view(AtomPostFeed)
+tag_feed = feed_view(TagFeed)
+atom_tag_feed = feed_view(AtomTagFeed)
+category_feed = feed_view(CategoryFeed)
+atom_category_feed = feed_view(AtomCategoryFeed)
@@ -0,0 +1,204 @@
+"""
+代码块高亮缓存
+codehilite每次渲染都会用Pygments重新高亮全部代码块（没有标注语言时还要逐个猜测语言），
+而很多文章包含相同的代码片段，编辑文章时通常也只改动正文
+这里按 (渲染器签名, 代码块原文) 的校验值缓存高亮后的HTML：代码块原文包含语言、属性和代码，
+渲染器签名包含Pygments版本和codehilite的样式配置，任一变化都会得到新的缓存键，
+重新渲染编辑过的文章时只有改动过的代码块需要重新高亮
+
+缓存分两级：进程内的LRU缓存（BLOG_HIGHLIGHT_CACHE_SIZE条，淘汰最久未使用的代码块），
+和多个进程共享的Django缓存（BLOG_HIGHLIGHT_CACHE_ALIAS，为None时只使用进程内缓存），
+共享缓存的淘汰方式取决于后端，按LRU淘汰需要使用配置了allkeys-lru的Redis（见settings.py）
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from markdown.extensions import Extension
+from markdown.extensions.codehilite import CodeHilite, HiliteTreeprocessor
+from markdown.preprocessors import Preprocessor
+
+
+DEFAULT_LOCAL_SIZE = 2000
+
+# 共享缓存中的保存时间（秒），缓存键已包含渲染器签名，配置变化后旧结果自然失效
+SHARED_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+
+
+class LRUCache:
+    """线程安全的LRU缓存，超过maxsize条时淘汰最久未使用的条目"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.data:
+                return None
+            self.data.move_to_end(key)
+            return self.data[key]
+
+    def set(self, key, value):
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+
+_local_cache = None
+
+
+def get_local_cache():
+    global _local_cache
+    if _local_cache is None:
+        _local_cache = LRUCache(getattr(settings, 'BLOG_HIGHLIGHT_CACHE_SIZE', DEFAULT_LOCAL_SIZE))
+    return _local_cache
+
+
+def get_shared_cache():
+    alias = getattr(settings, 'BLOG_HIGHLIGHT_CACHE_ALIAS', None)
+    return caches[alias] if alias else None
+
+
+def block_key(signature, kind, source):
+    digest = hashlib.sha256(f'{signature}\x00{kind}\x00{source}'.encode('utf-8')).hexdigest()
+    return f'highlight:{digest}'
+
+
+def lookup(keys):
+    """按缓存键读取高亮结果，先查进程内缓存，未命中的再批量查共享缓存"""
+    local = get_local_cache()
+    found = {}
+    for key in keys:
+        html = local.get(key)
+        if html is not None:
+            found[key] = html
+
+    shared = get_shared_cache()
+    missing = [key for key in keys if key not in found]
+    if shared is not None and missing:
+        for key, html in shared.get_many(missing).items():
+            local.set(key, html)
+            found[key] = html
+    return found
+
+
+def store(entries):
+    local = get_local_cache()
+    for key, html in entries.items():
+        local.set(key, html)
+    shared = get_shared_cache()
+    if shared is not None and entries:
+        shared.set_many(entries, SHARED_CACHE_TIMEOUT)
+
+
+class CachedFencedBlockPreprocessor(Preprocessor):
+    """
+    在fenced_code之前处理围栏代码块：命中缓存的直接放入htmlStash，
+    未命中的交给fenced_code处理单个代码块，再把它的输出写入缓存，高亮逻辑与fenced_code完全一致
+    """
+
+    def __init__(self, md, signature):
+        super().__init__(md)
+        self.signature = signature
+
+    def run(self, lines):
+        if 'fenced_code_block' not in self.md.preprocessors:
+            return lines
+        fenced = self.md.preprocessors['fenced_code_block']
+
+        text = '\n'.join(lines)
+        matches = list(fenced.FENCED_BLOCK_RE.finditer(text))
+        if not matches:
+            return lines
+
+        keys = [block_key(self.signature, 'fenced', match.group(0)) for match in matches]
+        cached = lookup(keys)
+        rendered = {}
+        parts = []
+        position = 0
+        for match, key in zip(matches, keys):
+            html = cached.get(key) or rendered.get(key)
+            if html is not None:
+                replacement = f'\n{self.md.htmlStash.store(html)}\n'
+            else:
+                counter = self.md.htmlStash.html_counter
+                replacement = '\n'.join(fenced.run(match.group(0).split('\n')))
+                if self.md.htmlStash.html_counter == counter:
+                    # fenced_code不认为这是代码块（例如属性的括号不匹配），原样留给它处理
+                    continue
+                rendered[key] = self.md.htmlStash.rawHtmlBlocks[-1]
+            parts.append(text[position:match.start()])
+            parts.append(replacement)
+            position = match.end()
+        parts.append(text[position:])
+
+        store(rendered)
+        return ''.join(parts).split('\n')
+
+
+class CachedHiliteTreeprocessor(HiliteTreeprocessor):
+    """缩进代码块的高亮，与HiliteTreeprocessor相同，结果按代码内容缓存"""
+
+    def __init__(self, md, signature):
+        super().__init__(md)
+        self.signature = signature
+
+    def run(self, root):
+        blocks = [
+            block for block in root.iter('pre')
+            if len(block) == 1 and block[0].tag == 'code' and block[0].text is not None
+        ]
+        if not blocks:
+            return
+
+        sources = [self.code_unescape(block[0].text) for block in blocks]
+        keys = [block_key(self.signature, f'indented:{self.md.tab_length}', source) for source in sources]
+        cached = lookup(keys)
+        rendered = {}
+        for block, source, key in zip(blocks, sources, keys):
+            html = cached.get(key) or rendered.get(key)
+            if html is None:
+                local_config = self.config.copy()
+                html = rendered[key] = CodeHilite(
+                    source,
+                    tab_length=self.md.tab_length,
+                    style=local_config.pop('pygments_style', 'default'),
+                    **local_config
+                ).hilite()
+            placeholder = self.md.htmlStash.store(html)
+            # 与HiliteTreeprocessor相同，改为p元素，输出时替换为高亮后的HTML
+            block.clear()
+            block.tag = 'p'
+            block.text = placeholder
+
+        store(rendered)
+
+
+class HighlightCacheExtension(Extension):
+    """
+    为codehilite的代码块高亮加上缓存，需要放在codehilite和fenced_code（或extra）之后
+    signature为渲染器签名（见rendering.renderer_signature），是缓存键的一部分
+    """
+
+    def __init__(self, signature, **kwargs):
+        self.signature = signature
+        super().__init__(**kwargs)
+
+    def extendMarkdown(self, md):
+        if 'hilite' not in md.treeprocessors:
+            # 没有启用codehilite时不需要缓存
+            return
+        # 在normalize_whitespace（30）之后、fenced_code（25）之前执行
+        md.preprocessors.register(
+            CachedFencedBlockPreprocessor(md, self.signature), 'cached_fenced_code_block', 27
+        )
+
+        hiliter = CachedHiliteTreeprocessor(md, self.signature)
+        hiliter.config = md.treeprocessors['hilite'].config
+        md.treeprocessors.register(hiliter, 'hilite', 30)
@@ -0,0 +1,332 @@
+"""
+Markdown文件导入
+单个文件、多个文件和ZIP压缩包共用同一条导入流水线：
+逐个读取文件 -> 解码、解析frontmatter并渲染（可分发到多个进程） -> 构建Post对象
+-> 在一个事务中按批bulk_create
+任一批次写入失败时整个导入回滚，不会留下导入了一半的数据
+"""
+import multiprocessing
+import os
+import re
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import django
+import frontmatter
+from django.conf import settings
+from django.db import transaction
+
+from .models import Post, make_excerpt
+from .pagecache import FEED_GROUP, LIST_GROUP, SITEMAP_GROUP, invalidate
+from .rendering import render_hash, render_markdown
+from .sitemaps import post_chunk_group
+
+
+MARKDOWN_EXTENSIONS = ('.md', '.markdown')
+ENCODINGS = ['utf-8', 'gbk', 'gb2312', 'utf-8-sig', 'latin1']
+DEFAULT_BATCH_SIZE = 500
+# 未显式指定进程数时，每个解析进程至少分到这么多文件；文件较少时在当前进程中解析，
+# 启动子进程（每个都要初始化Django）比解析本身更慢
+DEFAULT_MIN_FILES_PER_WORKER = 50
+
+
+@dataclass
+class FileResult:
+    """单个文件的导入结果"""
+    filename: str
+    status: str  # created / skipped / failed
+    message: str = ''
+    post_id: int | None = None
+
+
+@dataclass
+class ImportReport:
+    """一次导入的结果汇总，results按文件读取顺序排列"""
+    results: list = field(default_factory=list)
+
+    def add(self, filename, status, message=''):
+        result = FileResult(filename, status, message)
+        self.results.append(result)
+        return result
+
+    @property
+    def created(self):
+        return [result for result in self.results if result.status == 'created']
+
+    @property
+    def skipped(self):
+        return [result for result in self.results if result.status == 'skipped']
+
+    @property
+    def failed(self):
+        return [result for result in self.results if result.status == 'failed']
+
+    def as_dict(self):
+        return {
+            'created': len(self.created),
+            'skipped': len(self.skipped),
+            'failed': len(self.failed),
+            'files': [
+                {'filename': r.filename, 'status': r.status, 'message': r.message, 'post_id': r.post_id}
+                for r in self.results
+            ],
+        }
+
+
+def clean_notion_filename(filename):
+    """
+    清理Notion导出的文件名，去掉UUID哈希
+    例如: "2025 211130a0ce0b80e8a540fd3052af5f90.md" -> "2025.md"
+    """
+    # 去掉文件扩展名
+    name_without_ext = os.path.splitext(filename)[0]
+
+    # Notion UUID 格式: 32个十六进制字符
+    # 匹配模式: 文件名后面跟着空格和32位十六进制字符
+    pattern = r'\s+[0-9a-f]{32}$'
+    cleaned_name = re.sub(pattern, '', name_without_ext, flags=re.IGNORECASE)
+
+    # 如果没有匹配到Notion格式，返回原始文件名（不含扩展名）
+    return cleaned_name if cleaned_name else name_without_ext
+
+
+def decode_content(raw_content):
+    """尝试多种编码解码，全部失败时忽略无法解码的字节"""
+    for encoding in ENCODINGS:
+        try:
+            return raw_content.decode(encoding)
+        except (UnicodeDecodeError, AttributeError):
+            continue
+    return raw_content.decode('utf-8', errors='ignore')
+
+
+def is_true(value):
+    """frontmatter中的布尔值，也接受 "true"、"yes" 等字符串"""
+    if isinstance(value, str):
+        return value.strip().lower() in ('true', 'yes', 'on', '1')
+    return bool(value)
+
+
+def parse_markdown(raw_content, filename):
+    """解析Markdown文件内容，返回Post字段字典"""
+    # 移除NUL字符(0x00)，PostgreSQL不允许这些字符
+    content = decode_content(raw_content).replace('\x00', '')
+
+    # 清理文件名（去掉Notion UUID）
+    cleaned_filename = clean_notion_filename(os.path.basename(filename))
+
+    # 尝试解析frontmatter
+    try:
+        post_data = frontmatter.loads(content)
+        title = post_data.get('title', cleaned_filename)
+        tags = post_data.get('tags', '')
+        category = post_data.get('category', '')
+        summary = post_data.get('summary', '')
+        draft = post_data.get('draft', False)
+        content_body = post_data.content
+    except Exception:
+        # 如果没有frontmatter，使用清理后的文件名作为标题
+        title = cleaned_filename
+        tags = ''
+        category = ''
+        summary = ''
+        draft = False
+        content_body = content
+
+    # 如果tags是列表，转换为逗号分隔的字符串
+    if isinstance(tags, list):
+        tags = ', '.join(str(tag) for tag in tags)
+
+    # 清理所有字段，移除NUL字符
+    return {
+        'title': str(title).replace('\x00', ''),
+        'tags': str(tags).replace('\x00', ''),
+        'category': str(category).replace('\x00', ''),
+        'summary': str(summary).replace('\x00', ''),
+        'content': str(content_body).replace('\x00', ''),
+        # 导出时未发布的文章标记为 draft: true，重新导入后仍为草稿
+        'is_published': not is_true(draft),
+    }
+
+
+def validate_fields(fields):
+    """检查字段长度，返回错误信息；没有问题时返回空字符串"""
+    for name in ('title', 'tags', 'category'):
+        max_length = Post._meta.get_field(name).max_length
+        if len(fields[name]) > max_length:
+            return f'{Post._meta.get_field(name).verbose_name}超过{max_length}个字符'
+    return ''
+
+
+def is_markdown(filename):
+    return filename.lower().endswith(MARKDOWN_EXTENSIONS)
+
+
+def is_zip_entry(info):
+    """跳过目录和macOS生成的__MACOSX资源文件"""
+    return not info.is_dir() and not info.filename.startswith('__MACOSX/')
+
+
+def count_zip_entries(zip_path):
+    """ZIP中需要处理的文件数量"""
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        return sum(1 for info in zip_ref.infolist() if is_zip_entry(info))
+
+
+def iter_zip_entries(zip_path):
+    """逐个产出ZIP中的文件 (文件名, 读取函数)，不会一次性解压全部内容"""
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        for info in zip_ref.infolist():
+            if is_zip_entry(info):
+                yield info.filename, lambda info=info: zip_ref.read(info)
+
+
+def read_entry(filename, read):
+    """读取文件内容，返回 (内容, 错误信息)；非Markdown文件返回 (None, '')"""
+    if not is_markdown(filename):
+        return None, ''
+    try:
+        return read(), ''
+    except Exception as exc:
+        return None, f'读取失败: {exc}'
+
+
+def prepare_entry(filename, raw_content):
+    """
+    解析单个文件：解码、解析frontmatter、检查字段并渲染Markdown，返回 (字段字典, 错误信息)
+    只处理纯Python数据，可以在子进程中执行
+    """
+    try:
+        fields = parse_markdown(raw_content, filename)
+    except Exception as exc:
+        return None, f'解析失败: {exc}'
+
+    error = validate_fields(fields)
+    if error:
+        return None, error
+
+    fields['excerpt'] = make_excerpt(fields['summary'], fields['content'])
+    fields['content_html'], fields['toc_html'] = render_markdown(fields['content'])
+    fields['render_hash'] = render_hash(fields['content'])
+    return fields, ''
+
+
+def get_worker_count(workers=None, total=None):
+    """
+    解析进程数：参数优先，其次为BLOG_IMPORT_WORKERS设置，都未指定时使用CPU核数
+    没有通过参数指定且已知文件数total时，按BLOG_IMPORT_MIN_FILES_PER_WORKER减少进程数，
+    少量文件（例如上传单个文件）直接在当前进程中解析
+    """
+    if workers is None:
+        workers = getattr(settings, 'BLOG_IMPORT_WORKERS', None) or os.cpu_count() or 1
+        if total is not None:
+            per_worker = getattr(settings, 'BLOG_IMPORT_MIN_FILES_PER_WORKER', DEFAULT_MIN_FILES_PER_WORKER)
+            workers = min(workers, total // per_worker)
+    return max(workers, 1)
+
+
+def iter_prepared(entries, workers):
+    """
+    按文件原顺序产出 (文件名, 字段字典, 错误信息)
+    workers大于1时把解析分发到进程池，已提交但未取走的文件最多workers*4个，内存占用有上限
+    读取文件和收集结果都在当前进程中进行，数据库仍只由当前进程写入
+    """
+    if workers <= 1:
+        for filename, read in entries:
+            raw_content, error = read_entry(filename, read)
+            if raw_content is None:
+                yield filename, None, error
+            else:
+                yield filename, *prepare_entry(filename, raw_content)
+        return
+
+    def resolve(item):
+        filename, future, error = item
+        if future is None:
+            return filename, None, error
+        return filename, *future.result()
+
+    # 使用spawn而不是fork，子进程不会继承当前进程的数据库连接和进度线程
+    # 子进程需要先初始化Django，才能导入本模块执行prepare_entry
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=django.setup) as pool:
+        queue = deque()
+        for filename, read in entries:
+            raw_content, error = read_entry(filename, read)
+            if raw_content is None:
+                queue.append((filename, None, error))
+            else:
+                queue.append((filename, pool.submit(prepare_entry, filename, raw_content), ''))
+
+            while len(queue) > workers * 4:
+                yield resolve(queue.popleft())
+
+        while queue:
+            yield resolve(queue.popleft())
+
+
+def import_entries(entries, author, batch_size=None, progress=None, workers=None, total=None):
+    """
+    导入流水线：entries为 (文件名, 读取函数) 的可迭代对象
+    解析失败的文件记为failed并继续；数据库写入在同一个事务中按批bulk_create
+    progress为可选回调，每处理完一个文件以report为参数调用一次
+    workers为解析进程数（默认读取BLOG_IMPORT_WORKERS），1表示在当前进程中解析；total为文件总数（已知时）
+    """
+    batch_size = batch_size or getattr(settings, 'BLOG_IMPORT_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    report = ImportReport()
+    pending = []
+    # 新文章所在的站点地图分段
+    sitemap_groups = set()
+
+    def flush():
+        posts = Post.objects.bulk_create([post for post, _ in pending])
+        Post.sync_tags_bulk(posts)
+        sitemap_groups.update(post_chunk_group(post.pk) for post in posts)
+        for post, result in pending:
+            result.post_id = post.pk
+        pending.clear()
+
+    with transaction.atomic():
+        for filename, fields, error in iter_prepared(entries, get_worker_count(workers, total)):
+            if fields is not None:
+                post = Post(author=author, **fields)
+                post.refresh_derived_fields()
+                pending.append((post, report.add(filename, 'created')))
+            elif error:
+                report.add(filename, 'failed', error)
+            else:
+                report.add(filename, 'skipped', '不是Markdown文件')
+
+            if len(pending) >= batch_size:
+                flush()
+            if progress is not None:
+                progress(report)
+
+        if pending:
+            flush()
+        # bulk_create不触发信号，这里手动清除列表页、订阅和站点地图的缓存（事务提交后生效）
+        if report.created:
+            invalidate(LIST_GROUP, FEED_GROUP, SITEMAP_GROUP, *sitemap_groups)
+
+    return report
+
+
+def import_zip(zip_path, author, batch_size=None, progress=None, workers=None):
+    """导入磁盘上的ZIP压缩包"""
+    return import_entries(
+        iter_zip_entries(zip_path), author, batch_size=batch_size, progress=progress, workers=workers,
+        total=count_zip_entries(zip_path),
+    )
+
+
+def build_archive(files, archive_path):
+    """将上传的多个markdown文件打包为ZIP，后台任务统一按压缩包处理"""
+    with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for uploaded in files:
+            if uploaded is None:
+                continue
+            with archive.open(os.path.basename(uploaded.name), 'w') as entry:
+                for chunk in uploaded.chunks():
+                    entry.write(chunk)
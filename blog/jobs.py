@@ -0,0 +1,178 @@
+"""
+后台导入任务
+上传请求只负责保存文件并创建ImportJob，实际导入由独立的worker进程完成：
+    python manage.py run_import_worker
+任务队列直接存放在数据库中，worker用 SELECT ... FOR UPDATE SKIP LOCKED 领取任务，可以同时运行多个
+"""
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.files import File
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .importers import build_archive, count_zip_entries, import_zip
+from .models import ImportJob
+
+
+logger = logging.getLogger(__name__)
+
+# 进度写回数据库的最小间隔（秒）
+PROGRESS_INTERVAL = 0.5
+
+# 处理中的任务超过该时间没有更新时，认为worker已退出，重新放回队列
+STALE_AFTER = timedelta(minutes=10)
+
+# worker检查超时任务的间隔（秒）：其他worker异常退出后留下的任务不必等到重启才被重新领取
+REQUEUE_INTERVAL = 60
+
+
+def create_import_job(upload_type, files, user):
+    """保存上传的文件并创建导入任务，返回ImportJob"""
+    files = [uploaded for uploaded in files if uploaded is not None]
+    if not files:
+        return None
+
+    job = ImportJob(created_by=user)
+    if upload_type == 'zip':
+        job.original_name = files[0].name
+        job.archive.save(os.path.basename(files[0].name), files[0], save=False)
+    else:
+        # 单个/多个markdown文件先打包为ZIP，worker统一按压缩包处理
+        job.original_name = files[0].name if len(files) == 1 else f'{len(files)} 个文件'
+        with tempfile.TemporaryFile(suffix='.zip') as temp_file:
+            build_archive(files, temp_file)
+            temp_file.seek(0)
+            job.archive.save('upload.zip', File(temp_file), save=False)
+    job.save()
+    return job
+
+
+def requeue_stale_jobs():
+    """将长时间没有进度更新的处理中任务重新放回队列"""
+    return ImportJob.objects.filter(
+        status=ImportJob.STATUS_RUNNING,
+        updated_at__lt=timezone.now() - STALE_AFTER,
+    ).update(status=ImportJob.STATUS_PENDING, processed_files=0, started_at=None)
+
+
+def claim_next_job():
+    """领取最早的待处理任务，没有任务时返回None"""
+    with transaction.atomic():
+        job = (
+            ImportJob.objects.select_for_update(skip_locked=True)
+            .filter(status=ImportJob.STATUS_PENDING)
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = ImportJob.STATUS_RUNNING
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at', 'updated_at'])
+    return job
+
+
+class ProgressReporter:
+    """
+    导入在一个事务中执行，事务内的写入在提交前对其他连接不可见
+    进度更新交给单独的线程（Django为每个线程使用独立的数据库连接）以自动提交方式写入
+    """
+
+    def __init__(self, job):
+        self.job_id = job.pk
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.last_update = 0
+
+    def __call__(self, report):
+        now = time.monotonic()
+        if now - self.last_update < PROGRESS_INTERVAL:
+            return
+        self.last_update = now
+        self.executor.submit(self._write, {
+            'processed_files': len(report.results),
+            'created_count': len(report.created),
+            'skipped_count': len(report.skipped),
+            'failed_count': len(report.failed),
+            'errors': [
+                {'filename': result.filename, 'message': result.message}
+                for result in report.failed[:100]
+            ],
+        })
+
+    def _write(self, values):
+        ImportJob.objects.filter(pk=self.job_id).update(updated_at=timezone.now(), **values)
+
+    @staticmethod
+    def _close_connection():
+        # 每个线程使用各自的连接，必须在写入线程内调用close才能关闭（或归还给连接池）该线程的连接
+        connection.close()
+
+    def close(self):
+        self.executor.submit(self._close_connection)
+        self.executor.shutdown(wait=True)
+
+
+def run_job(job):
+    """执行导入任务并记录结果"""
+    reporter = ProgressReporter(job)
+    try:
+        zip_path = job.archive.path
+        job.total_files = count_zip_entries(zip_path)
+        job.save(update_fields=['total_files', 'updated_at'])
+
+        report = import_zip(zip_path, job.created_by, progress=reporter)
+    except Exception as exc:
+        logger.exception('导入任务 %s 失败', job.pk)
+        reporter.close()
+        job.refresh_from_db()
+        job.status = ImportJob.STATUS_FAILED
+        job.created_count = 0
+        job.errors = [*job.errors, {'filename': job.original_name, 'message': f'导入失败，已全部回滚: {exc}'}]
+        job.finished_at = timezone.now()
+        job.save()
+        return job
+
+    reporter.close()
+    job.refresh_from_db()
+    job.status = ImportJob.STATUS_DONE
+    job.processed_files = len(report.results)
+    job.created_count = len(report.created)
+    job.skipped_count = len(report.skipped)
+    job.failed_count = len(report.failed)
+    job.errors = [{'filename': result.filename, 'message': result.message} for result in report.failed[:100]]
+    job.finished_at = timezone.now()
+    job.save()
+
+    # 导入完成后删除上传的压缩包（保留文件名作为记录；失败的任务保留文件，便于排查或重试）
+    job.archive.storage.delete(job.archive.name)
+    return job
+
+
+def run_worker(interval=2.0, once=False, stdout=None):
+    """持续领取并处理任务；once为True时处理完当前队列后退出"""
+    next_requeue = 0
+    while True:
+        close_old_connections()
+        if time.monotonic() >= next_requeue:
+            requeue_stale_jobs()
+            next_requeue = time.monotonic() + REQUEUE_INTERVAL
+        job = claim_next_job()
+        if job is None:
+            if once:
+                return
+            time.sleep(interval)
+            continue
+
+        if stdout is not None:
+            stdout.write(f'开始处理导入任务 #{job.pk}: {job.original_name}')
+        job = run_job(job)
+        if stdout is not None:
+            stdout.write(
+                f'任务 #{job.pk} {job.get_status_display()}：导入 {job.created_count}，'
+                f'跳过 {job.skipped_count}，失败 {job.failed_count}'
+            )
@@ -0,0 +1,116 @@
+"""
+Markdown导入吞吐量基准测试
+生成包含大量Markdown文件的ZIP压缩包，按不同的批次大小和解析进程数运行导入流水线并统计每秒导入的文件数
+所有写入都在事务中执行并最终回滚，不会在数据库中留下测试数据：
+    python manage.py benchmark_import --files 5000 --batch-size 1 100 500 --workers 1 4
+"""
+import os
+import tempfile
+import time
+import zipfile
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from blog.importers import get_worker_count, import_zip
+
+
+SAMPLE_TEMPLATE = '''---
+title: 基准测试文章 {index}
+tags: [Python, Django, 标签{tag}]
+category: 基准测试
+---
+
+# 第 {index} 篇
+
+这是一段用于导入基准测试的正文内容，包含**加粗**、*斜体*和`行内代码`。
+
+```python
+def handler_{index}(request):
+    return render(request, 'blog/post_list.html', {{'index': {index}}})
+```
+
+| 列1 | 列2 |
+|-----|-----|
+| {index} | {tag} |
+'''
+
+
+class Rollback(Exception):
+    """用于在计时结束后回滚事务"""
+
+
+class Command(BaseCommand):
+    help = '测试Markdown/ZIP导入流水线的吞吐量（结果回滚，不写入数据）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--files', type=int, default=2000, help='压缩包中的文件数量（默认2000）')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            nargs='+',
+            default=[1, 100, 500],
+            help='要对比的批次大小，可指定多个（默认 1 100 500）',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            nargs='+',
+            default=[None],
+            help='要对比的解析进程数，可指定多个（默认使用BLOG_IMPORT_WORKERS设置）',
+        )
+        parser.add_argument('--username', default=None, help='作为作者的用户名（默认使用第一个超级管理员）')
+
+    def handle(self, *args, **options):
+        author = self.get_author(options['username'])
+
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as temp_file:
+            zip_path = temp_file.name
+        try:
+            self.build_archive(zip_path, options['files'])
+            size_mb = os.path.getsize(zip_path) / 1024 / 1024
+            self.stdout.write(f'测试压缩包: {options["files"]} 个文件, {size_mb:.1f} MB')
+
+            for workers in options['workers']:
+                for batch_size in options['batch_size']:
+                    elapsed, report = self.run_import(zip_path, author, batch_size, workers)
+                    rate = len(report.created) / elapsed if elapsed else 0
+                    self.stdout.write(
+                        f'workers={get_worker_count(workers, options["files"]):<3} batch_size={batch_size:<6} '
+                        f'导入 {len(report.created)} 个文件, 耗时 {elapsed:.2f}s, {rate:.0f} 文件/秒'
+                    )
+        finally:
+            os.remove(zip_path)
+
+    def get_author(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'用户 {username} 不存在')
+        author = User.objects.filter(is_superuser=True).order_by('pk').first()
+        if author is None:
+            raise CommandError('没有可用的超级管理员，请使用 --username 指定作者')
+        return author
+
+    def build_archive(self, zip_path, count):
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for index in range(count):
+                archive.writestr(
+                    f'export/文章 {index:032x}.md',
+                    SAMPLE_TEMPLATE.format(index=index, tag=index % 50),
+                )
+
+    def run_import(self, zip_path, author, batch_size, workers):
+        """在事务中运行一次导入并计时，结束后回滚"""
+        report = None
+        start = time.perf_counter()
+        try:
+            with transaction.atomic():
+                report = import_zip(zip_path, author, batch_size=batch_size, workers=workers)
+                elapsed = time.perf_counter() - start
+                raise Rollback
+        except Rollback:
+            pass
+        return elapsed, report
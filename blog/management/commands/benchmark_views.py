@@ -0,0 +1,363 @@
+"""
+页面基准测试
+依次请求blog.urls中的每个URL（以及搜索、标签筛选、翻页等常见变体），统计吞吐量、
+p50/p95/p99延迟和每个请求的查询数，结果保存为JSON，便于在不同提交之间对比：
+    python manage.py generate_load_data --posts 100000
+    python manage.py benchmark_views --requests 200
+    python manage.py benchmark_views --compare benchmarks/<上一次的结果>.json
+默认在进程内用测试客户端经WSGI处理器请求，--asgi 改为经ASGI处理器请求（AsyncClient），
+两者都可以用 --concurrency 指定并发数（WSGI为多线程，ASGI为同一事件循环中的多个协程），用于对比两种部署方式：
+    python manage.py benchmark_views --no-page-cache --concurrency 20 --output benchmarks/wsgi.json
+    python manage.py benchmark_views --no-page-cache --concurrency 20 --asgi --compare benchmarks/wsgi.json
+指定 --base-url 时请求运行中的服务器（此时不统计查询数），例如分别用runserver和uvicorn启动后对比
+未登录页面默认会命中整页缓存，使用 --no-page-cache 测试未命中缓存时的开销
+"""
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
+from http.cookiejar import CookieJar
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, reset_queries
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils.encoding import iri_to_uri
+
+from blog import urls as blog_urls
+from blog.models import Comment, ImportJob, Post, Tag
+from blog.pagination import KeysetPaginator
+from blog.sitemaps import chunk_size
+
+
+# 需要登录管理员账号才能访问的页面
+ADMIN_URLS = {
+    'upload_markdown', 'import_job_progress', 'db_pool_stats',
+    'create_post', 'edit_post', 'delete_post', 'delete_comment',
+}
+
+# 每次请求都会读取全部文章，不适合反复压测
+SKIPPED_URLS = {'export_posts'}
+
+
+class Command(BaseCommand):
+    help = '对blog.urls中的页面进行基准测试，输出吞吐量、延迟分位数和查询数，并保存为JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100, help='每个URL的请求次数（默认100）')
+        parser.add_argument('--warmup', type=int, default=5, help='每个URL正式计时前的预热请求次数（默认5）')
+        parser.add_argument('--concurrency', type=int, default=1, help='并发请求数（默认1）')
+        parser.add_argument('--asgi', action='store_true', help='进程内经ASGI处理器请求，默认经WSGI处理器')
+        parser.add_argument('--base-url', default=None, help='请求运行中的服务器，例如 http://127.0.0.1:8000')
+        parser.add_argument('--username', default=None, help='访问管理页面使用的管理员（默认第一个超级管理员）')
+        parser.add_argument('--password', default=None, help='管理员密码，仅用于 --base-url')
+        parser.add_argument('--no-page-cache', action='store_true', help='禁用匿名整页缓存，仅用于进程内测试')
+        parser.add_argument('--only', nargs='+', default=None, help='只测试指定名称的页面，例如 post_list post_detail')
+        parser.add_argument('--output', default=None, help='结果JSON路径（默认 benchmarks/<时间>-<提交>.json）')
+        parser.add_argument('--compare', default=None, help='与之前保存的JSON结果对比')
+
+    def handle(self, *args, **options):
+        if settings.DEBUG:
+            self.stderr.write('提示：当前 DEBUG=True，结果会比生产配置慢')
+
+        self.options = options
+        scenarios = self.build_scenarios()
+        if options['only']:
+            scenarios = [scenario for scenario in scenarios if scenario['name'].split('?')[0] in options['only']]
+        if not scenarios:
+            raise CommandError('没有可测试的URL')
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency 必须大于0')
+
+        results = []
+        page_cache = override_settings(CACHES={
+            **settings.CACHES, 'pages': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+        }) if options['no_page_cache'] else nullcontext()
+        with page_cache:
+            for scenario in scenarios:
+                results.append(self.run_scenario(scenario))
+                self.write_result(results[-1])
+
+        report = {
+            'commit': self.git_commit(),
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'mode': self.mode(),
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'python': platform.python_version(),
+            'debug': settings.DEBUG,
+            'page_cache': not options['no_page_cache'],
+            'dataset': {
+                'posts': Post.objects.count(),
+                'comments': Comment.objects.count(),
+                'tags': Tag.objects.count(),
+            },
+            'results': results,
+        }
+        output = options['output'] or os.path.join(
+            'benchmarks', f'{datetime.now():%Y%m%d-%H%M%S}-{report["commit"] or "unknown"}.json'
+        )
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'结果已保存到 {output}'))
+
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    def mode(self):
+        if self.options['base_url']:
+            return 'server'
+        return 'asgi' if self.options['asgi'] else 'client'
+
+    def write_result(self, result):
+        queries = result['queries'] if result['queries'] is not None else '-'
+        self.stdout.write(
+            f'{result["name"]:<24} {result["status"]:<4} {result["throughput"]:>8.1f} req/s  '
+            f'p50 {result["p50_ms"]:>7.2f}ms  p95 {result["p95_ms"]:>7.2f}ms  p99 {result["p99_ms"]:>7.2f}ms  '
+            f'查询 {queries}'
+        )
+
+    def build_scenarios(self):
+        """为blog.urls中的每个URL确定参数，并补充搜索、标签筛选、翻页等变体"""
+        post = Post.objects.filter(is_published=True).order_by('-comment_count', '-pk').first()
+        comment = Comment.objects.filter(post=post).order_by('pk').first() if post else None
+        job = ImportJob.objects.order_by('-pk').first()
+        tag = Tag.objects.filter(post_count__gt=0).first()
+        objects = {
+            'post_detail': post, 'edit_post': post, 'delete_post': post,
+            'delete_comment': comment, 'import_job_progress': job,
+        }
+        arguments = {name: {'pk': obj.pk} for name, obj in objects.items() if obj is not None}
+        if tag:
+            arguments.update(tag_feed={'name': tag.name}, atom_tag_feed={'name': tag.name})
+        category = Post.objects.filter(is_published=True).exclude(category='').values_list('category', flat=True).first()
+        if category:
+            arguments.update(category_feed={'name': category}, atom_category_feed={'name': category})
+        if post:
+            arguments['sitemap_chunk'] = {'chunk': post.pk // chunk_size()}
+
+        scenarios = []
+        for pattern in blog_urls.urlpatterns:
+            name = pattern.name
+            if name in SKIPPED_URLS:
+                continue
+            kwargs = {}
+            if pattern.pattern.converters:
+                if name not in arguments:
+                    self.stderr.write(f'跳过 {name}：没有可用的数据')
+                    continue
+                kwargs = arguments[name]
+            scenarios.append({'name': name, 'url': reverse(name, kwargs=kwargs), 'admin': name in ADMIN_URLS})
+
+        cursor = self.second_page_cursor()
+        extras = [
+            ('post_list?cursor', f'{reverse("post_list")}?cursor={cursor}' if cursor else None),
+            ('search_posts?q', f'{reverse("search_posts")}?q=数据库'),
+            ('tag_cloud?tag', f'{reverse("tag_cloud")}?tag={tag.name}' if tag else None),
+        ]
+        scenarios.extend({'name': name, 'url': url, 'admin': False} for name, url in extras if url)
+        return scenarios
+
+    def second_page_cursor(self):
+        return KeysetPaginator(Post.objects.filter(is_published=True).for_listing(), 10).get_page().next_cursor
+
+    def host(self):
+        hosts = [host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*']
+        return hosts[0] if hosts else 'localhost'
+
+    def admin_user(self):
+        username = self.options['username']
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'用户 {username} 不存在')
+        return User.objects.filter(is_superuser=True).order_by('pk').first()
+
+    def run_scenario(self, scenario):
+        if self.options['base_url']:
+            timings, status, wall = self.run_http(scenario)
+            queries = None
+        else:
+            user = self.scenario_user(scenario)
+            run = self.run_asgi if self.options['asgi'] else self.run_client
+            timings, status, wall = run(scenario, user)
+            queries = self.count_queries(scenario, user)
+
+        quantiles = statistics.quantiles(timings, n=100, method='inclusive') if len(timings) > 1 else timings * 99
+        return {
+            'name': scenario['name'],
+            'url': scenario['url'],
+            'status': status,
+            'requests': len(timings),
+            # 吞吐量按计时阶段实际经过的时间计算，并发请求时大于单个请求延迟的倒数
+            'throughput': len(timings) / wall if wall else 0,
+            'mean_ms': statistics.fmean(timings) * 1000,
+            'p50_ms': quantiles[49] * 1000,
+            'p95_ms': quantiles[94] * 1000,
+            'p99_ms': quantiles[98] * 1000,
+            'queries': queries,
+        }
+
+    def scenario_user(self, scenario):
+        if not scenario['admin']:
+            return None
+        user = self.admin_user()
+        if user is None:
+            raise CommandError('没有可用的超级管理员，请使用 --username 指定')
+        return user
+
+    def make_client(self, user):
+        client = Client(HTTP_HOST=self.host())
+        if user is not None:
+            client.force_login(user)
+        return client
+
+    def run_client(self, scenario, user):
+        """进程内经WSGI处理器请求，每个线程使用自己的测试客户端，相当于多线程的WSGI服务器"""
+        local = threading.local()
+
+        def fetch():
+            if not hasattr(local, 'client'):
+                local.client = self.make_client(user)
+            start = time.perf_counter()
+            response = local.client.get(scenario['url'])
+            if response.streaming:
+                # 流式响应（站点地图等）在读取内容时才生成，计入请求耗时
+                b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - start
+            reset_queries()
+            return elapsed, response.status_code
+
+        # 每个工作线程都执行一次，关闭线程自己的数据库连接（使用连接池时归还连接），
+        # 否则每个场景新建的线程都会占用一个连接直到线程被回收
+        barrier = threading.Barrier(self.options['concurrency'])
+
+        def close_connections():
+            barrier.wait()
+            connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=self.options['concurrency']) as executor:
+            for _ in range(self.options['warmup']):
+                executor.submit(fetch).result()
+            start = time.perf_counter()
+            results = list(executor.map(lambda _: fetch(), range(self.options['requests'])))
+            wall = time.perf_counter() - start
+            list(executor.map(lambda _: close_connections(), range(self.options['concurrency'])))
+        return [elapsed for elapsed, _ in results], max(status for _, status in results), wall
+
+    def run_asgi(self, scenario, user):
+        """进程内经ASGI处理器请求，并发请求是同一事件循环中的多个协程"""
+        async def run():
+            client = AsyncClient()
+            if user is not None:
+                await client.aforce_login(user)
+            semaphore = asyncio.Semaphore(self.options['concurrency'])
+
+            async def fetch():
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.get(scenario['url'])
+                    if response.streaming:
+                        async for _ in response:
+                            pass
+                    return time.perf_counter() - start, response.status_code
+
+            for _ in range(self.options['warmup']):
+                await fetch()
+            start = time.perf_counter()
+            results = await asyncio.gather(*(fetch() for _ in range(self.options['requests'])))
+            return results, time.perf_counter() - start
+
+        # AsyncClient的请求总是带有 Host: testserver，与测试运行器一样临时允许该主机名
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            results, wall = asyncio.run(run())
+        return [elapsed for elapsed, _ in results], max(status for _, status in results), wall
+
+    def count_queries(self, scenario, user):
+        """单独请求一次统计查询数，不影响计时"""
+        client = self.make_client(user)
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(scenario['url'])
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return len(captured)
+
+    def run_http(self, scenario):
+        """请求运行中的服务器；管理页面先登录获取会话"""
+        base_url = self.options['base_url'].rstrip('/')
+        cookies = CookieJar()
+        opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(cookies))
+        if scenario['admin']:
+            self.login(opener, cookies, base_url)
+
+        def fetch():
+            start = time.perf_counter()
+            try:
+                with opener.open(base_url + iri_to_uri(scenario['url'])) as response:
+                    response.read()
+                    status = response.status
+            except urllib.error.HTTPError as exc:
+                status = exc.code
+            return time.perf_counter() - start, status
+
+        for _ in range(self.options['warmup']):
+            fetch()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.options['concurrency']) as executor:
+            results = list(executor.map(lambda _: fetch(), range(self.options['requests'])))
+        wall = time.perf_counter() - start
+        return [elapsed for elapsed, _ in results], max(status for _, status in results), wall
+
+    def login(self, opener, cookies, base_url):
+        user = self.admin_user()
+        if user is None or not self.options['password']:
+            raise CommandError('测试管理页面需要 --username 和 --password')
+        login_url = base_url + reverse('login')
+        with opener.open(login_url) as response:
+            response.read()
+        token = next((cookie.value for cookie in cookies if cookie.name == settings.CSRF_COOKIE_NAME), '')
+        data = urllib.parse.urlencode({
+            'username': user.username, 'password': self.options['password'], 'csrfmiddlewaretoken': token,
+        }).encode()
+        with opener.open(urllib.request.Request(login_url, data=data, headers={'Referer': login_url})) as response:
+            response.read()
+
+    def compare(self, path, results):
+        """输出与之前结果的p50/p95和吞吐量变化"""
+        with open(path, encoding='utf-8') as f:
+            previous = {result['name']: result for result in json.load(f)['results']}
+
+        self.stdout.write(f'\n与 {path} 对比：')
+        for result in results:
+            old = previous.get(result['name'])
+            if old is None:
+                continue
+            changes = []
+            for key in ('throughput', 'p50_ms', 'p95_ms'):
+                delta = (result[key] - old[key]) / old[key] * 100 if old[key] else 0
+                changes.append(f'{key} {old[key]:.1f} -> {result[key]:.1f} ({delta:+.0f}%)')
+            self.stdout.write(f'{result["name"]:<24} ' + '  '.join(changes))
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return ''
@@ -0,0 +1,48 @@
+"""
+构建站点样式
+使用Tailwind CSS独立命令行工具（tailwindcss-bin，不需要Node.js）把 assets/tailwind.css 编译为 static/css/blog.css，
+只包含模板中用到的工具类。修改模板中的class后运行：
+    python manage.py build_css
+开发时可以加 --watch 在模板变化后自动重新构建
+"""
+import shutil
+import subprocess
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = '编译并压缩Tailwind CSS样式表（assets/tailwind.css -> static/css/blog.css）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--watch',
+            action='store_true',
+            help='监视模板变化并自动重新构建（不压缩）',
+        )
+        parser.add_argument(
+            '--cli',
+            default='tailwindcss',
+            help='Tailwind CSS命令行工具的路径（默认从PATH中查找tailwindcss）',
+        )
+
+    def handle(self, *args, **options):
+        cli = shutil.which(options['cli'])
+        if cli is None:
+            raise CommandError(f'找不到 {options["cli"]}，请先安装开发依赖（uv sync 或 pip install tailwindcss-bin）')
+
+        source = settings.BASE_DIR / 'assets' / 'tailwind.css'
+        output = settings.BASE_DIR / 'static' / 'css' / 'blog.css'
+        output.parent.mkdir(parents=True, exist_ok=True)
+
+        command = [cli, '--input', str(source), '--output', str(output)]
+        command.append('--watch' if options['watch'] else '--minify')
+        try:
+            subprocess.run(command, cwd=settings.BASE_DIR, check=True)
+        except subprocess.CalledProcessError as exc:
+            raise CommandError(f'构建失败（退出码 {exc.returncode}）')
+        except KeyboardInterrupt:
+            return
+
+        self.stdout.write(self.style.SUCCESS(f'已生成 {output.relative_to(settings.BASE_DIR)}（{output.stat().st_size} 字节）'))
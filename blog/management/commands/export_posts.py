@@ -0,0 +1,36 @@
+"""
+导出全部文章
+把每篇文章导出为带frontmatter的Markdown文件，打包为ZIP（可以通过上传页面重新导入），运行：
+    python manage.py export_posts backup.zip
+文章分批读取、逐个文件写入，文章再多内存占用也不变
+"""
+from django.core.management.base import BaseCommand
+
+from blog.exporters import export_queryset, iter_zip
+
+
+class Command(BaseCommand):
+    help = '将全部文章导出为Markdown文件（含frontmatter）的ZIP压缩包'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='输出的ZIP文件路径')
+        parser.add_argument(
+            '--published-only',
+            action='store_true',
+            help='只导出已发布的文章（默认导出全部，草稿在frontmatter中标记draft: true）',
+        )
+
+    def handle(self, *args, **options):
+        posts = export_queryset()
+        if options['published_only']:
+            posts = posts.filter(is_published=True)
+
+        size = 0
+        with open(options['output'], 'wb') as output:
+            for chunk in iter_zip(posts):
+                output.write(chunk)
+                size += len(chunk)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'已导出 {posts.count()} 篇文章到 {options["output"]}（{size / 1024 / 1024:.1f} MB）'
+        ))
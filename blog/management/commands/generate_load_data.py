@@ -0,0 +1,266 @@
+"""
+生成压测用的大规模模拟数据
+文章包含中英文混排的正文、代码块、表格和列表，带有标签、分类和多层评论树；
+相同的 --seed 生成相同的数据，便于在不同提交之间对比基准测试结果：
+    python manage.py generate_load_data --posts 100000 --seed 42
+生成的用户名以 loadtest_ 开头。建议使用单独的数据库运行
+"""
+import random
+import time
+from datetime import timedelta
+from functools import partial
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from blog.importers import get_worker_count, iter_prepared
+from blog.models import Comment, Post
+from blog.pagecache import invalidate_all
+from blog.rendering import render_hash, render_markdown_batch
+
+
+CJK_SENTENCES = [
+    '这篇文章记录了在生产环境中排查性能问题的完整过程。',
+    '数据库索引的设计需要结合实际的查询语句来考虑。',
+    '缓存可以显著降低响应时间，但失效策略往往是最难的部分。',
+    '我们先用基准测试确认瓶颈，再决定优化的方向。',
+    '异步任务队列让Web进程不再被耗时操作阻塞。',
+    '全文检索对中文需要额外的分词处理。',
+    '分页查询在数据量增大后会逐渐变慢。',
+    '模板渲染的开销常常被低估。',
+    '每一次优化都应该有可以复现的测量结果。',
+    '连接池的大小需要根据并发量和数据库的承载能力来设置。',
+    '日志和指标是线上问题排查的第一手资料。',
+    '代码高亮在服务端完成，浏览器不需要加载额外的脚本。',
+    '评论区支持任意层级的回复。',
+    'Markdown文件可以批量导入，也可以打包为ZIP上传。',
+    '静态资源应该设置较长的缓存时间并使用带哈希的文件名。',
+    '读写分离可以分担主库的压力，但要注意复制延迟。',
+]
+
+EN_WORDS = (
+    'django python postgres index cache query latency throughput worker queue template render '
+    'markdown pygments cursor keyset pagination benchmark profile async pool replica feed sitemap '
+    'static asset gzip brotli header etag middleware signal transaction bulk stream export'
+).split()
+
+CODE_SNIPPETS = [
+    ('python', 'def handler(request, pk):\n    post = get_object_or_404(Post, pk=pk)\n'
+               '    return render(request, "blog/post_detail.html", {"post": post})'),
+    ('python', 'for chunk in queryset.iterator(chunk_size=2000):\n    process(chunk)'),
+    ('javascript', 'async function poll(url) {\n  const response = await fetch(url);\n'
+                   '  return response.json();\n}'),
+    ('go', 'func main() {\n\tfor i := 0; i < 10; i++ {\n\t\tfmt.Println(i)\n\t}\n}'),
+    ('sql', 'SELECT id, title FROM blog_post\nWHERE is_published\nORDER BY created_at DESC, id DESC\nLIMIT 10;'),
+    ('bash', 'python manage.py migrate\npython manage.py runserver 0.0.0.0:8000'),
+]
+
+TAG_POOL = [
+    'Python', 'Django', 'PostgreSQL', 'Go', 'Rust', 'JavaScript', 'Linux', 'Docker', 'Kubernetes', 'Redis',
+    '性能优化', '数据库', '缓存', '架构', '读书笔记', '随笔', '前端', '后端', '运维', '算法',
+]
+
+CATEGORIES = ['技术', '教程', '随笔', '读书', '工具', '架构', '运维', '前端', '数据库', '生活', '翻译', '笔记']
+
+COMMENT_TEMPLATES = [
+    '写得很好，{word} 这部分解释得很清楚 👍',
+    '请问 `{word}` 在生产环境中是怎么配置的？',
+    '我们也遇到过类似的问题，最后是通过 **{word}** 解决的。',
+    '> {sentence}\n\n同意这个观点。',
+    '补充一点：\n\n```python\n{word} = True\n```',
+    'Thanks for sharing, the {word} section helped a lot.',
+]
+
+
+class Command(BaseCommand):
+    help = '生成压测用的大规模模拟数据（文章、标签、分类、多层评论）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100000, help='文章数量（默认100000）')
+        parser.add_argument('--comments', type=float, default=5.0, help='平均每篇文章的评论数（默认5）')
+        parser.add_argument('--max-depth', type=int, default=12, help='评论树的最大层级（默认12）')
+        parser.add_argument('--tags', type=int, default=300, help='标签总数（默认300）')
+        parser.add_argument('--authors', type=int, default=20, help='作者数量（默认20）')
+        parser.add_argument('--users', type=int, default=500, help='评论用户数量（默认500）')
+        parser.add_argument('--days', type=int, default=3650, help='文章发布时间分布的天数（默认3650）')
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批写入的文章数量（默认1000）')
+        parser.add_argument('--workers', type=int, default=None, help='渲染Markdown的进程数（默认使用BLOG_IMPORT_WORKERS设置）')
+        parser.add_argument('--seed', type=int, default=42, help='随机数种子（默认42）')
+
+    def handle(self, *args, **options):
+        self.options = options
+        # 文章在导入流水线中预读生成（预读多少取决于进程数），评论在写入每批文章时生成，
+        # 两者使用各自的随机数序列，生成的数据才与进程数、批次大小无关
+        self.rng = random.Random(options['seed'])
+        self.comment_rng = random.Random(f'{options["seed"]}:comments')
+        start = time.perf_counter()
+
+        self.authors = self.ensure_users('loadtest_author', options['authors'])
+        self.commenters = self.ensure_users('loadtest_user', options['users'])
+        self.tags = self.build_tag_names(options['tags'])
+        self.tag_weights = [1 / (index + 1) for index in range(len(self.tags))]
+        self.comment_pool = self.build_comment_pool()
+        self.now = timezone.now()
+        self.meta = {}
+
+        created_posts = 0
+        created_comments = 0
+        pending = []
+        entries = (self.build_entry(index) for index in range(options['posts']))
+        for filename, fields, error in iter_prepared(entries, get_worker_count(options['workers'])):
+            if fields is None:
+                self.stderr.write(f'{filename}: {error}')
+                continue
+            pending.append(self.build_post(filename, fields))
+            if len(pending) >= options['batch_size']:
+                created_comments += self.flush(pending)
+                created_posts += len(pending)
+                pending = []
+                self.stdout.write(f'已生成 {created_posts}/{options["posts"]} 篇文章，{created_comments} 条评论')
+
+        if pending:
+            created_comments += self.flush(pending)
+            created_posts += len(pending)
+
+        invalidate_all()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE blog_post, blog_comment, blog_tag, blog_post_tag_objects')
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'完成：{created_posts} 篇文章，{created_comments} 条评论，耗时 {elapsed:.1f}s'
+        ))
+
+    def ensure_users(self, prefix, count):
+        """创建（或复用）指定数量的用户，返回用户id列表"""
+        names = [f'{prefix}_{index}' for index in range(count)]
+        existing = set(User.objects.filter(username__in=names).values_list('username', flat=True))
+        password = make_password(None)
+        User.objects.bulk_create([User(username=name, password=password) for name in names if name not in existing])
+        ids = dict(User.objects.filter(username__in=names).values_list('username', 'id'))
+        return [ids[name] for name in names]
+
+    def build_tag_names(self, count):
+        names = list(TAG_POOL[:count])
+        names.extend(f'{self.rng.choice(EN_WORDS)}-{index}' for index in range(count - len(names)))
+        return names
+
+    def build_comment_pool(self):
+        """预先渲染一组评论内容，生成评论时直接复用"""
+        contents = []
+        for template in COMMENT_TEMPLATES:
+            for _ in range(20):
+                contents.append(template.format(word=self.rng.choice(EN_WORDS), sentence=self.rng.choice(CJK_SENTENCES)))
+        htmls = render_markdown_batch(contents)
+        return [(content, html, render_hash(content)) for content, html in zip(contents, htmls)]
+
+    def paragraph(self):
+        parts = []
+        for _ in range(self.rng.randint(2, 6)):
+            if self.rng.random() < 0.7:
+                parts.append(self.rng.choice(CJK_SENTENCES))
+            else:
+                parts.append(' '.join(self.rng.choices(EN_WORDS, k=self.rng.randint(5, 15))).capitalize() + '.')
+        return ''.join(parts)
+
+    def build_body(self, index):
+        """生成一篇文章的Markdown正文"""
+        blocks = [self.paragraph()]
+        for section in range(self.rng.randint(2, 6)):
+            blocks.append(f'## 第{section + 1}节 {self.rng.choice(EN_WORDS).title()}')
+            blocks.append(self.paragraph())
+            roll = self.rng.random()
+            if roll < 0.4:
+                language, code = self.rng.choice(CODE_SNIPPETS)
+                blocks.append(f'```{language}\n{code}\n```')
+            elif roll < 0.6:
+                rows = '\n'.join(
+                    f'| {self.rng.choice(EN_WORDS)} | {self.rng.randint(1, 1000)} | {self.rng.choice(CJK_SENTENCES)[:8]} |'
+                    for _ in range(self.rng.randint(2, 6))
+                )
+                blocks.append(f'| 名称 | 数值 | 说明 |\n|------|------|------|\n{rows}')
+            elif roll < 0.8:
+                blocks.append('\n'.join(f'- {self.rng.choice(CJK_SENTENCES)}' for _ in range(self.rng.randint(2, 5))))
+        return '\n\n'.join(blocks)
+
+    def build_entry(self, index):
+        """生成一篇文章的Markdown文件（含frontmatter），返回 (文件名, 读取函数)，交给导入流水线解析和渲染"""
+        tags = list(dict.fromkeys(self.rng.choices(self.tags, weights=self.tag_weights, k=self.rng.randint(1, 4))))
+        document = '\n'.join([
+            '---',
+            f'title: "{self.rng.choice(EN_WORDS).title()} {self.rng.choice(CJK_SENTENCES)[:10]} #{index}"',
+            f'tags: [{", ".join(tags)}]',
+            f'category: {self.rng.choice(CATEGORIES)}',
+            f'summary: "{self.rng.choice(CJK_SENTENCES)}"' if self.rng.random() < 0.3 else 'summary: ""',
+            '---',
+            '',
+            self.build_body(index),
+        ])
+
+        filename = f'{index}.md'
+        comment_count = min(int(self.rng.expovariate(1 / self.options['comments'])), 500) if self.options['comments'] else 0
+        self.meta[filename] = {
+            'author_id': self.rng.choice(self.authors),
+            # 按编号均匀分布发布时间，编号越大越新
+            'created_at': self.now - timedelta(days=self.options['days']) * (1 - index / max(self.options['posts'], 1)),
+            'is_published': self.rng.random() < 0.95,
+            'comment_count': comment_count,
+        }
+        return filename, partial(document.encode, 'utf-8')
+
+    def build_post(self, filename, fields):
+        # 发布状态等由生成器决定，覆盖解析frontmatter得到的值
+        post = Post(**{**fields, **self.meta.pop(filename)})
+        post.refresh_derived_fields()
+        return post
+
+    @transaction.atomic
+    def flush(self, posts):
+        """写入一批文章及其标签关联和评论，返回评论数量"""
+        posts = Post.objects.bulk_create(posts)
+        Post.sync_tags_bulk(posts)
+
+        total = sum(post.comment_count for post in posts)
+        if not total:
+            return 0
+
+        # 预先从序列中取出评论id，父评论的id和路径在插入前就能确定，所有评论一次写入
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence('blog_comment', 'id')) FROM generate_series(1, %s)", [total]
+            )
+            ids = iter([row[0] for row in cursor.fetchall()])
+
+        comments = []
+        for post in posts:
+            comments.extend(self.build_thread(post, ids))
+        Comment.objects.bulk_create(comments, batch_size=2000)
+        return len(comments)
+
+    def build_thread(self, post, ids):
+        """为文章生成评论树：约一半为回复，回复偏向最近的评论，从而形成较深的对话链"""
+        comments = []
+        for index in range(post.comment_count):
+            parent = None
+            if comments and self.comment_rng.random() < 0.5:
+                parent = comments[-1] if self.comment_rng.random() < 0.6 else self.comment_rng.choice(comments)
+                if parent.path.count('/') >= self.options['max_depth']:
+                    parent = None
+
+            pk = next(ids)
+            content, html, content_hash = self.comment_rng.choice(self.comment_pool)
+            comments.append(Comment(
+                pk=pk,
+                post_id=post.pk,
+                author_id=self.comment_rng.choice(self.commenters),
+                parent_id=parent.pk if parent else None,
+                path=f'{parent.path if parent else ""}{pk:0{Comment.PATH_SEGMENT_WIDTH}d}/',
+                content=content,
+                content_html=html,
+                render_hash=content_hash,
+                created_at=post.created_at + timedelta(minutes=index + 1),
+            ))
+        return comments
@@ -0,0 +1,24 @@
+"""
+校正冗余计数
+文章评论数和标签文章数在日常操作中增量维护，直接修改数据库或中途出错可能导致偏差，运行：
+    python manage.py reconcile_counts
+"""
+from django.core.management.base import BaseCommand
+
+from blog.models import Post, Tag
+from blog.pagecache import invalidate_all
+
+
+class Command(BaseCommand):
+    help = '按实际数据重新统计文章评论数和标签文章数，只更新不一致的记录'
+
+    def handle(self, *args, **options):
+        posts = Post.refresh_comment_counts()
+        self.stdout.write(self.style.SUCCESS(f'已校正 {posts} 篇文章的评论数'))
+
+        tags = Tag.refresh_counts()
+        self.stdout.write(self.style.SUCCESS(f'已校正 {tags} 个标签的文章数'))
+
+        # 批量更新不触发信号，统一清除页面缓存
+        if posts or tags:
+            invalidate_all()
@@ -0,0 +1,70 @@
+"""
+批量重新渲染文章和评论的HTML
+升级Markdown/Pygments或修改MARKDOWN_EXTENSIONS等渲染配置后运行：
+    python manage.py rerender_posts
+"""
+from django.core.management.base import BaseCommand
+
+from blog.models import Post, Comment
+from blog.pagecache import invalidate_all
+
+
+class Command(BaseCommand):
+    help = '重新生成文章和评论的预渲染HTML（仅处理内容或渲染配置已变化的记录）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='忽略校验值，强制重新渲染所有记录',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='每批读取和写回的记录数量（默认200）',
+        )
+        parser.add_argument(
+            '--skip-comments',
+            action='store_true',
+            help='只处理文章，跳过评论',
+        )
+
+    def handle(self, *args, **options):
+        targets = [
+            ('文章', Post, ['content_html', 'toc_html', 'render_hash']),
+        ]
+        if not options['skip_comments']:
+            targets.append(('评论', Comment, ['content_html', 'render_hash']))
+
+        for label, model, fields in targets:
+            checked, rendered = self.rerender(model, fields, options['force'], options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f'已检查 {checked} 条{label}，重新渲染 {rendered} 条'
+            ))
+
+        # bulk_update不触发信号，统一清除页面缓存
+        invalidate_all()
+
+    def rerender(self, model, fields, force, batch_size):
+        """逐批检查并重新渲染，返回 (检查数量, 渲染数量)"""
+        objects = model.objects.only('id', 'content', 'render_hash').order_by('pk')
+
+        checked = 0
+        rendered = 0
+        batch = []
+        for obj in objects.iterator(chunk_size=batch_size):
+            checked += 1
+            if obj.render_content(force=force):
+                batch.append(obj)
+            if len(batch) >= batch_size:
+                # bulk_update不会触发auto_now，更新时间保持不变
+                model.objects.bulk_update(batch, fields)
+                rendered += len(batch)
+                batch = []
+
+        if batch:
+            model.objects.bulk_update(batch, fields)
+            rendered += len(batch)
+
+        return checked, rendered
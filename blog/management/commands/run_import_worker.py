@@ -0,0 +1,32 @@
+"""
+后台导入worker
+处理上传页面创建的导入任务，与Web进程分开运行：
+    python manage.py run_import_worker
+"""
+from django.core.management.base import BaseCommand
+
+from blog.jobs import run_worker
+
+
+class Command(BaseCommand):
+    help = '处理Markdown导入任务队列'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='队列为空时的轮询间隔（秒，默认2）',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='处理完当前所有待处理任务后退出',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('导入worker已启动')
+        try:
+            run_worker(interval=options['interval'], once=options['once'], stdout=self.stdout)
+        except KeyboardInterrupt:
+            self.stdout.write('导入worker已停止')
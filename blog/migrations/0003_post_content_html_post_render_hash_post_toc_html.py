@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_comment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='渲染后的内容'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='render_hash',
+            field=models.CharField(blank=True, editable=False, max_length=40, verbose_name='渲染校验值'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='toc_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='目录'),
+        ),
+    ]
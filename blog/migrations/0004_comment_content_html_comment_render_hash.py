@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_post_content_html_post_render_hash_post_toc_html'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='渲染后的内容'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='render_hash',
+            field=models.CharField(blank=True, editable=False, max_length=40, verbose_name='渲染校验值'),
+        ),
+    ]
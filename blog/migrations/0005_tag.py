@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_comment_content_html_comment_render_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, unique=True, verbose_name='名称')),
+                ('post_count', models.PositiveIntegerField(default=0, editable=False, verbose_name='已发布文章数')),
+            ],
+            options={
+                'verbose_name': '标签',
+                'verbose_name_plural': '标签',
+                'ordering': ['-post_count', 'name'],
+                'indexes': [models.Index(fields=['-post_count', 'name'], name='blog_tag_count_name_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='tag_objects',
+            field=models.ManyToManyField(blank=True, editable=False, related_name='posts', to='blog.tag', verbose_name='标签关联'),
+        ),
+    ]
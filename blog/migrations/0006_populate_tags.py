@@ -0,0 +1,45 @@
+from django.db import migrations
+from django.db.models import Count, Q
+
+
+def split_tags(value):
+    """与blog.models.parse_tags保持一致（迁移中不直接引用应用代码）"""
+    if not value:
+        return []
+    tags = [tag.strip() for tag in value.replace('，', ',').split(',')]
+    return list(dict.fromkeys(tag for tag in tags if tag))
+
+
+def populate_tags(apps, schema_editor):
+    """将文章的逗号分隔标签迁移为Tag记录和多对多关联，并统计已发布文章数"""
+    Post = apps.get_model('blog', 'Post')
+    Tag = apps.get_model('blog', 'Tag')
+    PostTag = Post.tag_objects.through
+
+    tag_ids = {}
+    links = []
+    for post_id, tags in Post.objects.exclude(tags='').values_list('id', 'tags').iterator(chunk_size=1000):
+        for name in split_tags(tags):
+            if name not in tag_ids:
+                tag_ids[name] = Tag.objects.get_or_create(name=name)[0].pk
+            links.append(PostTag(post_id=post_id, tag_id=tag_ids[name]))
+        if len(links) >= 1000:
+            PostTag.objects.bulk_create(links, ignore_conflicts=True)
+            links = []
+    PostTag.objects.bulk_create(links, ignore_conflicts=True)
+
+    tags = Tag.objects.annotate(published=Count('posts', filter=Q(posts__is_published=True)))
+    for tag in tags:
+        tag.post_count = tag.published
+    Tag.objects.bulk_update(tags, ['post_count'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_tag'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:12
+
+import re
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import TextField, Value
+
+
+# 与blog.search保持一致（迁移中不直接引用应用代码）
+SEARCH_WEIGHTS = (
+    ('title', 'A'),
+    ('tags', 'B'),
+    ('category', 'B'),
+    ('summary', 'C'),
+    ('content', 'D'),
+)
+CJK_RUN = re.compile('[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]+')
+
+
+def cjk_bigrams(run):
+    if len(run) == 1:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def segment(text):
+    if not text:
+        return ''
+    return CJK_RUN.sub(lambda match: ' ' + ' '.join(cjk_bigrams(match.group())) + ' ', str(text))
+
+
+def search_vector(post):
+    vector = None
+    for field, weight in SEARCH_WEIGHTS:
+        part = SearchVector(Value(segment(getattr(post, field)), output_field=TextField()), config='simple', weight=weight)
+        vector = part if vector is None else vector + part
+    return vector
+
+
+def populate_search_vector(apps, schema_editor):
+    """为已有文章生成检索向量"""
+    Post = apps.get_model('blog', 'Post')
+    fields = ['id', 'title', 'tags', 'category', 'summary', 'content']
+    batch = []
+    for post in Post.objects.only(*fields).iterator(chunk_size=500):
+        post.search_vector = search_vector(post)
+        batch.append(post)
+        if len(batch) >= 500:
+            Post.objects.bulk_update(batch, ['search_vector'])
+            batch = []
+    Post.objects.bulk_update(batch, ['search_vector'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_populate_tags'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='检索向量'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='blog_post_search_gin'),
+        ),
+        migrations.RunPython(populate_search_vector, migrations.RunPython.noop),
+    ]
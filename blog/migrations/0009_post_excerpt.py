@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:14
+
+from django.db import migrations, models
+
+
+def populate_excerpt(apps, schema_editor):
+    """为已有文章生成列表摘要（规则与blog.models.make_excerpt一致）"""
+    Post = apps.get_model('blog', 'Post')
+    batch = []
+    for post in Post.objects.only('id', 'summary', 'content').iterator(chunk_size=500):
+        if post.summary:
+            post.excerpt = post.summary
+        else:
+            post.excerpt = post.content[:150] + '...' if len(post.content) > 150 else post.content
+        batch.append(post)
+        if len(batch) >= 500:
+            Post.objects.bulk_update(batch, ['excerpt'])
+            batch = []
+    Post.objects.bulk_update(batch, ['excerpt'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_post_published_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.TextField(blank=True, editable=False, verbose_name='列表摘要'),
+        ),
+        migrations.RunPython(populate_excerpt, migrations.RunPython.noop),
+    ]
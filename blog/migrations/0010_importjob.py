@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:16
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_post_excerpt'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('archive', models.FileField(upload_to='imports/%Y/%m/', verbose_name='导入文件')),
+                ('original_name', models.CharField(blank=True, max_length=255, verbose_name='原始文件名')),
+                ('status', models.CharField(choices=[('pending', '等待处理'), ('running', '处理中'), ('done', '已完成'), ('failed', '失败')], default='pending', max_length=10, verbose_name='状态')),
+                ('total_files', models.PositiveIntegerField(default=0, verbose_name='文件总数')),
+                ('processed_files', models.PositiveIntegerField(default=0, verbose_name='已处理文件数')),
+                ('created_count', models.PositiveIntegerField(default=0, verbose_name='导入成功')),
+                ('skipped_count', models.PositiveIntegerField(default=0, verbose_name='跳过')),
+                ('failed_count', models.PositiveIntegerField(default=0, verbose_name='失败')),
+                ('errors', models.JSONField(blank=True, default=list, verbose_name='错误信息')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='创建时间')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='开始时间')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='完成时间')),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='上传者')),
+            ],
+            options={
+                'verbose_name': '导入任务',
+                'verbose_name_plural': '导入任务',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='blog_importjob_queue_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_paths(apps, schema_editor):
+    """为已有评论生成物化路径；回复总是晚于父评论创建，按id顺序处理时父评论的路径已经生成"""
+    Comment = apps.get_model('blog', 'Comment')
+    paths = {}
+    batch = []
+    for comment in Comment.objects.only('id', 'parent_id').order_by('id').iterator(chunk_size=1000):
+        comment.path = f'{paths.get(comment.parent_id, "")}{comment.id:012d}/'
+        paths[comment.id] = comment.path
+        batch.append(comment)
+        if len(batch) >= 1000:
+            Comment.objects.bulk_update(batch, ['path'])
+            batch = []
+    Comment.objects.bulk_update(batch, ['path'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0010_importjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.TextField(blank=True, editable=False, verbose_name='路径'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'path'], name='blog_comment_thread_idx'),
+        ),
+        migrations.RunPython(populate_paths, migrations.RunPython.noop),
+    ]
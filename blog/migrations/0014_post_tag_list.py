@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:46
+
+from django.db import migrations, models
+
+
+def split_tags(value):
+    """与blog.models.parse_tags保持一致（迁移中不直接引用应用代码）"""
+    if not value:
+        return []
+    tags = [tag.strip() for tag in value.replace('，', ',').split(',')]
+    return list(dict.fromkeys(tag for tag in tags if tag))
+
+
+def populate_tag_list(apps, schema_editor):
+    """为已有文章生成标签列表"""
+    Post = apps.get_model('blog', 'Post')
+    batch = []
+    for post in Post.objects.only('id', 'tags').iterator(chunk_size=500):
+        post.tag_list = split_tags(post.tags)
+        batch.append(post)
+        if len(batch) >= 500:
+            Post.objects.bulk_update(batch, ['tag_list'])
+            batch = []
+    Post.objects.bulk_update(batch, ['tag_list'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0013_comment_post_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='tag_list',
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name='标签列表'),
+        ),
+        migrations.RunPython(populate_tag_list, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,86 @@
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
 from django.contrib.auth.models import User
 from django.utils import timezone
 
+from .rendering import render_hash, render_markdown, render_markdown_batch
+from .search import SEARCH_WEIGHTS, build_search_vector
+
+
+def parse_tags(value):
+    """将标签字符串分割为去重后的列表（支持英文逗号和中文逗号），保持原有顺序"""
+    if not value:
+        return []
+    tags = [tag.strip() for tag in value.replace('，', ',').split(',')]
+    return list(dict.fromkeys(tag for tag in tags if tag))
+
+
+class Tag(models.Model):
+    """标签模型"""
+    name = models.CharField('名称', max_length=200, unique=True)
+    # 关联的已发布文章数量，随文章保存/删除增量更新
+    post_count = models.PositiveIntegerField('已发布文章数', default=0, editable=False)
+
+    class Meta:
+        verbose_name = '标签'
+        verbose_name_plural = '标签'
+        ordering = ['-post_count', 'name']
+        indexes = [
+            models.Index(fields=['-post_count', 'name'], name='blog_tag_count_name_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def refresh_counts(cls, tag_ids=None):
+        """按关联表重新统计标签的已发布文章数（tag_ids为None时统计全部标签）"""
+        tags = cls.objects.all() if tag_ids is None else cls.objects.filter(pk__in=tag_ids)
+        tags = tags.annotate(published=Count('posts', filter=Q(posts__is_published=True)))
+        updated = []
+        for tag in tags:
+            if tag.post_count != tag.published:
+                tag.post_count = tag.published
+                updated.append(tag)
+        cls.objects.bulk_update(updated, ['post_count'])
+        return len(updated)
+
+
+def make_excerpt(summary, content):
+    """列表页摘要：有摘要时使用摘要，否则从内容中提取前150个字符"""
+    if summary:
+        return summary
+    return content[:150] + '...' if len(content) > 150 else content
+
+
+class PostQuerySet(models.QuerySet):
+    # 列表页模板用到的字段，不包含正文和预渲染HTML等大字段
+    # updated_at和comment_count同时是文章卡片片段缓存的版本
+    LIST_FIELDS = [
+        'id', 'title', 'excerpt', 'created_at', 'updated_at', 'category', 'tag_list', 'comment_count',
+        'author', 'author__username',
+    ]
+
+    # RSS/Atom订阅用到的字段，使用预渲染的HTML，不读取Markdown原文
+    FEED_FIELDS = [
+        'id', 'title', 'excerpt', 'content_html', 'created_at', 'updated_at', 'category', 'tag_list',
+        'author', 'author__username',
+    ]
+
+    def for_listing(self):
+        """列表页查询：只读取卡片需要的列，并一并取出作者"""
+        return self.select_related('author').only(*self.LIST_FIELDS)
+
+    def for_feed(self):
+        """订阅查询：只读取订阅条目需要的列，并一并取出作者"""
+        return self.select_related('author').only(*self.FEED_FIELDS)
+
 
 class Post(models.Model):
     """博客文章模型"""
@@ -16,35 +95,230 @@ class Post(models.Model):
     # 可选的元数据字段（从frontmatter中读取）
     tags = models.CharField('标签', max_length=200, blank=True, help_text='多个标签用逗号分隔')
     category = models.CharField('分类', max_length=100, blank=True)
+    # 由tags字段解析得到的标签列表（保存时生成），模板直接使用，不再逐篇拆分
+    tag_list = models.JSONField('标签列表', default=list, blank=True, editable=False)
+    # 由tags字段同步生成的标签关联，用于标签云和按标签筛选
+    tag_objects = models.ManyToManyField(Tag, related_name='posts', blank=True, editable=False, verbose_name='标签关联')
+
+    # 列表页摘要（保存时由summary或content生成，列表页无需读取正文）
+    excerpt = models.TextField('列表摘要', blank=True, editable=False)
+
+    # 预渲染的HTML（保存时根据内容和渲染配置自动生成）
+    content_html = models.TextField('渲染后的内容', blank=True, editable=False)
+    toc_html = models.TextField('目录', blank=True, editable=False)
+    render_hash = models.CharField('渲染校验值', max_length=40, blank=True, editable=False)
+
+    # 全文检索向量（标题、标签、分类、摘要、正文加权），保存时自动更新
+    search_vector = SearchVectorField('检索向量', null=True, editable=False)
+
+    # 评论数（评论新增/删除时由信号以F表达式增减，python manage.py reconcile_counts 可校正）
+    comment_count = models.PositiveIntegerField('评论数', default=0, editable=False)
+
+    # 计数字段只通过F表达式更新，save()不写回，避免用内存中的旧值覆盖并发的增减
+    COUNTER_FIELDS = {'comment_count'}
 
     class Meta:
         verbose_name = '博客文章'
         verbose_name_plural = '博客文章'
         ordering = ['-created_at']
+        indexes = [
+            # 游标分页按 (created_at, id) 从游标位置开始范围扫描
+            models.Index(fields=['-created_at', '-id'], condition=Q(is_published=True), name='blog_post_published_idx'),
+            # 分类订阅按分类取最新的已发布文章
+            models.Index(
+                fields=['category', '-created_at'], condition=Q(is_published=True), name='blog_post_category_idx'
+            ),
+            GinIndex(fields=['search_vector'], name='blog_post_search_gin'),
+        ]
+
+    objects = PostQuerySet.as_manager()
 
     def __str__(self):
         return self.title
 
     def get_summary(self):
-        """如果没有摘要，从内容中提取前150个字符"""
-        if self.summary:
-            return self.summary
-        return self.content[:150] + '...' if len(self.content) > 150 else self.content
+        """如果没有摘要，从内容中提取前150个字符（保存时已预先生成）"""
+        return self.excerpt
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 记录从数据库读取时的值，保存时据此判断标签和发布状态是否变化
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        # 重新读取的值同样记为数据库中的值，否则保存时会按读取之前的状态调整标签文章数
+        attnames = {field.attname for field in self._meta.concrete_fields}
+        deferred = self.get_deferred_fields()
+        refreshed = [name for name in (fields or attnames) if name in attnames and name not in deferred]
+        self._loaded_values = {
+            **getattr(self, '_loaded_values', {}),
+            **{name: getattr(self, name) for name in refreshed},
+        }
+
+    def render_content(self, force=False):
+        """
+        重新生成content_html和toc_html
+        内容和渲染配置都没有变化时跳过，返回是否进行了渲染
+        """
+        current_hash = render_hash(self.content)
+        if not force and current_hash == self.render_hash:
+            return False
+
+        self.content_html, self.toc_html = render_markdown(self.content)
+        self.render_hash = current_hash
+        return True
+
+    def refresh_derived_fields(self):
+        """
+        根据内容更新列表摘要、标签列表、预渲染HTML和检索向量，返回发生变化的字段
+        save()会自动调用；bulk_create不经过save()，批量导入时需要先手动调用
+        """
+        adding = self._state.adding
+        loaded = {} if adding else getattr(self, '_loaded_values', {})
+
+        changed_fields = set()
+        excerpt = make_excerpt(self.summary, self.content)
+        if excerpt != self.excerpt:
+            self.excerpt = excerpt
+            changed_fields.add('excerpt')
+        tag_list = parse_tags(self.tags)
+        if tag_list != self.tag_list:
+            self.tag_list = tag_list
+            changed_fields.add('tag_list')
+        if self.render_content():
+            changed_fields.update(['content_html', 'toc_html', 'render_hash'])
+        if adding or any(loaded.get(field) != getattr(self, field) for field, _ in SEARCH_WEIGHTS):
+            self.search_vector = build_search_vector(self)
+            changed_fields.add('search_vector')
+        return changed_fields
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        loaded = {} if adding else getattr(self, '_loaded_values', {})
+
+        changed_fields = self.refresh_derived_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and changed_fields:
+            kwargs['update_fields'] = {*update_fields, *changed_fields}
+        elif update_fields is None and not adding and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+
+        super().save(*args, **kwargs)
+
+        if adding or loaded.get('tags') != self.tags or loaded.get('is_published') != self.is_published:
+            was_published = False if adding else loaded.get('is_published')
+            self.sync_tags(was_published)
+
+        tracked = ['is_published', *(field for field, _ in SEARCH_WEIGHTS)]
+        self._loaded_values = {**loaded, **{field: getattr(self, field) for field in tracked}}
+
+    @classmethod
+    def sync_tags_bulk(cls, posts):
+        """为bulk_create新建的文章批量建立标签关联，并增量更新标签的已发布文章数"""
+        names_by_post = {post.pk: parse_tags(post.tags) for post in posts}
+        all_names = {name for names in names_by_post.values() for name in names}
+        if not all_names:
+            return
+
+        Tag.objects.bulk_create([Tag(name=name) for name in all_names], ignore_conflicts=True)
+        tag_ids = dict(Tag.objects.filter(name__in=all_names).values_list('name', 'pk'))
+
+        through = cls.tag_objects.through
+        through.objects.bulk_create([
+            through(post_id=post_id, tag_id=tag_ids[name])
+            for post_id, names in names_by_post.items()
+            for name in names
+        ], ignore_conflicts=True)
+
+        deltas = Counter(
+            tag_ids[name]
+            for post in posts if post.is_published
+            for name in names_by_post[post.pk]
+        )
+        for delta in set(deltas.values()):
+            tag_pks = [pk for pk, value in deltas.items() if value == delta]
+            Tag.objects.filter(pk__in=tag_pks).update(post_count=F('post_count') + delta)
+
+    def sync_tags(self, was_published=None):
+        """
+        根据tags字段同步标签关联，并增量更新标签的已发布文章数
+        was_published为保存前的发布状态，未知时(None)对受影响的标签重新统计
+        """
+        names = parse_tags(self.tags)
+        current = {tag.name: tag for tag in self.tag_objects.all()}
+
+        new_names = [name for name in names if name not in current]
+        if new_names:
+            Tag.objects.bulk_create([Tag(name=name) for name in new_names], ignore_conflicts=True)
+        added = list(Tag.objects.filter(name__in=new_names)) if new_names else []
+        removed = [tag for name, tag in current.items() if name not in names]
+        kept = [tag for name, tag in current.items() if name in names]
+
+        if removed:
+            self.tag_objects.remove(*removed)
+        if added:
+            self.tag_objects.add(*added)
+
+        if was_published is None:
+            Tag.refresh_counts([tag.pk for tag in [*added, *removed, *kept]])
+            return
+
+        deltas = {}
+        for tag in removed:
+            deltas[tag.pk] = -1 if was_published else 0
+        for tag in added:
+            deltas[tag.pk] = 1 if self.is_published else 0
+        for tag in kept:
+            deltas[tag.pk] = int(self.is_published) - int(was_published)
+
+        for delta in (1, -1):
+            tag_ids = [pk for pk, value in deltas.items() if value == delta]
+            if tag_ids:
+                Tag.objects.filter(pk__in=tag_ids).update(post_count=Greatest(F('post_count') + delta, 0))
+
+    @classmethod
+    def refresh_comment_counts(cls):
+        """按评论表重新统计评论数，只更新与实际不一致的文章，返回更新的数量"""
+        actual = Coalesce(Subquery(
+            Comment.objects.filter(post=OuterRef('pk')).order_by()
+            .values('post').annotate(total=Count('pk')).values('total')
+        ), 0)
+        return cls.objects.annotate(actual=actual).exclude(comment_count=F('actual')).update(comment_count=actual)
 
 
 class Comment(models.Model):
     """博客评论模型"""
-    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments', verbose_name='文章')
+    # 按文章查询评论使用 (post, path) 组合索引，不再单独为post建索引
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments', verbose_name='文章', db_index=False)
     author = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='作者')
     content = models.TextField('评论内容')
     created_at = models.DateTimeField('创建时间', default=timezone.now)
     updated_at = models.DateTimeField('更新时间', auto_now=True)
     parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='replies', verbose_name='父评论')
 
+    # 预渲染的HTML（保存时自动生成）
+    content_html = models.TextField('渲染后的内容', blank=True, editable=False)
+    render_hash = models.CharField('渲染校验值', max_length=40, blank=True, editable=False)
+
+    # 物化路径：从顶级评论到自身的id序列，例如 "000000000012/000000000045/"
+    # 按path排序即为评论树的深度优先顺序，整篇文章的评论树一次查询即可取出
+    path = models.TextField('路径', blank=True, editable=False)
+
+    PATH_SEGMENT_WIDTH = 12
+
     class Meta:
         verbose_name = '评论'
         verbose_name_plural = '评论'
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['post', 'path'], name='blog_comment_thread_idx'),
+        ]
 
     def __str__(self):
         return f'{self.author.username} 在 {self.post.title} 的评论'
@@ -52,3 +326,139 @@ class Comment(models.Model):
     def is_reply(self):
         """判断是否为回复评论"""
         return self.parent is not None
+
+    @property
+    def depth(self):
+        """层级，顶级评论为0"""
+        return max(self.path.count('/') - 1, 0)
+
+    def build_path(self):
+        """根据父评论的路径和自身id生成路径"""
+        prefix = self.parent.path if self.parent_id else ''
+        return f'{prefix}{self.pk:0{self.PATH_SEGMENT_WIDTH}d}/'
+
+    @classmethod
+    def build_thread(cls, comments):
+        """
+        整理按path排序的评论列表（即评论树的深度优先顺序），返回同样顺序的列表，模板按顺序输出，不需要递归
+        每条评论设置：thread_depth为在列表中的层级（父评论不在列表中时视为顶级），
+        has_replies为下一条是否是它的回复，closed_levels为输出它之后需要结束的上层回复列表数
+        """
+        levels = {}
+        for comment in comments:
+            comment.thread_depth = levels.get(comment.parent_id, -1) + 1
+            levels[comment.pk] = comment.thread_depth
+
+        for comment, following in zip(comments, [*comments[1:], None]):
+            next_depth = following.thread_depth if following is not None else 0
+            comment.has_replies = next_depth > comment.thread_depth
+            comment.closed_levels = range(0 if comment.has_replies else comment.thread_depth - next_depth)
+        return comments
+
+    def render_content(self, force=False):
+        """重新生成content_html，内容和渲染配置都没有变化时跳过，返回是否进行了渲染"""
+        current_hash = render_hash(self.content)
+        if not force and current_hash == self.render_hash:
+            return False
+
+        self.content_html = render_markdown_batch([self.content])[0]
+        self.render_hash = current_hash
+        return True
+
+    @classmethod
+    def render_many(cls, comments):
+        """批量渲染评论并写回数据库"""
+        comments = list(comments)
+        if not comments:
+            return
+
+        htmls = render_markdown_batch([comment.content for comment in comments])
+        for comment, html in zip(comments, htmls):
+            comment.content_html = html
+            comment.render_hash = render_hash(comment.content)
+        cls.objects.bulk_update(comments, ['content_html', 'render_hash'])
+
+    @classmethod
+    async def arender_many(cls, comments):
+        """render_many的异步版本：Markdown在线程池中渲染，不阻塞事件循环"""
+        comments = list(comments)
+        if not comments:
+            return
+
+        htmls = await sync_to_async(render_markdown_batch, thread_sensitive=False)(
+            [comment.content for comment in comments]
+        )
+        for comment, html in zip(comments, htmls):
+            comment.content_html = html
+            comment.render_hash = render_hash(comment.content)
+        await cls.objects.abulk_update(comments, ['content_html', 'render_hash'])
+
+    def save(self, *args, **kwargs):
+        if self.render_content():
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'content_html', 'render_hash'}
+        super().save(*args, **kwargs)
+
+        # 路径包含自身id，插入后才能生成
+        if not self.path:
+            self.path = self.build_path()
+            Comment.objects.filter(pk=self.pk).update(path=self.path)
+
+
+class ImportJob(models.Model):
+    """Markdown导入任务，上传后由后台worker进程（python manage.py run_import_worker）处理"""
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, '等待处理'),
+        (STATUS_RUNNING, '处理中'),
+        (STATUS_DONE, '已完成'),
+        (STATUS_FAILED, '失败'),
+    ]
+
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='上传者')
+    archive = models.FileField('导入文件', upload_to='imports/%Y/%m/')
+    original_name = models.CharField('原始文件名', max_length=255, blank=True)
+    status = models.CharField('状态', max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+
+    # 进度
+    total_files = models.PositiveIntegerField('文件总数', default=0)
+    processed_files = models.PositiveIntegerField('已处理文件数', default=0)
+    created_count = models.PositiveIntegerField('导入成功', default=0)
+    skipped_count = models.PositiveIntegerField('跳过', default=0)
+    failed_count = models.PositiveIntegerField('失败', default=0)
+    errors = models.JSONField('错误信息', default=list, blank=True)
+
+    created_at = models.DateTimeField('创建时间', default=timezone.now)
+    updated_at = models.DateTimeField('更新时间', auto_now=True)
+    started_at = models.DateTimeField('开始时间', null=True, blank=True)
+    finished_at = models.DateTimeField('完成时间', null=True, blank=True)
+
+    class Meta:
+        verbose_name = '导入任务'
+        verbose_name_plural = '导入任务'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='blog_importjob_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.original_name or self.archive.name} ({self.get_status_display()})'
+
+    def progress(self):
+        """进度信息，供上传页面轮询"""
+        return {
+            'id': self.pk,
+            'status': self.status,
+            'status_display': self.get_status_display(),
+            'total': self.total_files,
+            'processed': self.processed_files,
+            'created': self.created_count,
+            'skipped': self.skipped_count,
+            'failed': self.failed_count,
+            'errors': self.errors[:20],
+            'finished': self.status in (self.STATUS_DONE, self.STATUS_FAILED),
+        }
@@ -0,0 +1,222 @@
+"""
+匿名访问的整页缓存
+页面按URL缓存，缓存键中带有所属分组的版本号：
+    post:<id>  单篇文章的详情页，文章或其评论变化时失效
+    list       文章列表、搜索结果和标签页（显示评论数），任意文章或评论变化时失效
+    feeds      RSS/Atom订阅，只在文章变化时失效
+    sitemap    站点地图索引，文章变化时失效（各段站点地图另有按ID范围划分的分组，见sitemaps.py）
+失效时为分组生成新的版本号，旧页面不再命中并随过期时间自然清除
+已登录用户、非GET请求以及带有待显示消息的请求不使用缓存
+
+版本号同时记录生成时间，用作条件请求的ETag和Last-Modified：
+浏览器和爬虫重复访问时只需读取一次版本号，页面未变化时直接返回304
+
+两个装饰器都可以用于同步视图和异步视图
+"""
+import hashlib
+import time
+import uuid
+from datetime import datetime, timezone
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .routers import replica_may_lag
+
+
+DEFAULT_TIMEOUT = 600
+LIST_GROUP = 'list'
+FEED_GROUP = 'feeds'
+SITEMAP_GROUP = 'sitemap'
+
+
+def get_cache():
+    return caches[getattr(settings, 'BLOG_PAGE_CACHE_ALIAS', 'default')]
+
+
+def post_group(pk):
+    return f'post:{pk}'
+
+
+def new_version():
+    """版本号：(随机标识, 生成时间)"""
+    return uuid.uuid4().hex, time.time()
+
+
+def group_versions(cache, groups):
+    """读取各分组的版本号，不存在时（例如被缓存淘汰）生成新的版本号"""
+    keys = {group: f'pagecache:version:{group}' for group in groups}
+    found = cache.get_many(keys.values())
+    versions = []
+    for group, key in keys.items():
+        version = found.get(key)
+        if version is None:
+            version = new_version()
+            # add失败说明其他进程刚刚写入了版本号，以已写入的为准
+            if not cache.add(key, version, timeout=None):
+                version = cache.get(key, version)
+        versions.append(version)
+    return versions
+
+
+def invalidate(*groups):
+    """使分组下的缓存页面失效；在事务中调用时等到提交后执行，避免旧数据被重新缓存"""
+    def bump():
+        get_cache().set_many(
+            {f'pagecache:version:{group}': new_version() for group in groups},
+            timeout=None,
+        )
+    transaction.on_commit(bump)
+
+
+def invalidate_all():
+    """使所有缓存页面失效（用于批量导入、重新渲染等不触发信号的批量操作）"""
+    invalidate('all')
+
+
+def page_key(cache, request, group):
+    """返回 (缓存键, 页面数据最近一次变化的时间戳)"""
+    versions = group_versions(cache, ('all', group))
+    tokens = ':'.join(token for token, _ in versions)
+    path = hashlib.md5(request.get_full_path().encode('utf-8')).hexdigest()
+    return f'pagecache:page:{tokens}:{path}', max(ts for _, ts in versions)
+
+
+def resolve_group(group, args, kwargs):
+    return group(*args, **kwargs) if callable(group) else group
+
+
+def is_cacheable(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if request.user.is_authenticated:
+        return False
+    # 有待显示的消息（例如登出提示）时页面内容因人而异
+    return len(get_messages(request)) == 0
+
+
+def cached_response(cached):
+    content, content_type = cached
+    response = HttpResponse(content, content_type=content_type)
+    response['X-Page-Cache'] = 'hit'
+    return response
+
+
+def page_timeout(timeout=None):
+    if timeout is not None:
+        return timeout
+    return getattr(settings, 'BLOG_PAGE_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+
+
+def is_storable(response, changed_at):
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return False
+    # 数据刚刚变化时从副本读到的可能还是旧数据，不缓存，避免旧页面在新版本号下保存到过期
+    return not replica_may_lag(changed_at)
+
+
+def cache_anonymous_page(group, timeout=None):
+    """
+    视图装饰器：为匿名用户缓存整页HTML
+    group为分组名，或根据视图参数返回分组名的函数，例如 lambda pk: post_group(pk)
+    timeout为页面的过期时间（秒），默认为BLOG_PAGE_CACHE_TIMEOUT
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                # 判断是否登录需要读取会话和用户，读取版本号需要访问缓存，都在同步线程中一次完成
+                if not await sync_to_async(is_cacheable)(request):
+                    return await view_func(request, *args, **kwargs)
+
+                cache = get_cache()
+                key, changed_at = await sync_to_async(page_key)(cache, request, resolve_group(group, args, kwargs))
+                cached = await cache.aget(key)
+                if cached is not None:
+                    return cached_response(cached)
+
+                response = await view_func(request, *args, **kwargs)
+                if is_storable(response, changed_at):
+                    await cache.aset(key, (response.content, response['Content-Type']), page_timeout(timeout))
+                    response['X-Page-Cache'] = 'miss'
+                return response
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not is_cacheable(request):
+                return view_func(request, *args, **kwargs)
+
+            cache = get_cache()
+            key, changed_at = page_key(cache, request, resolve_group(group, args, kwargs))
+            cached = cache.get(key)
+            if cached is not None:
+                return cached_response(cached)
+
+            response = view_func(request, *args, **kwargs)
+            if is_storable(response, changed_at):
+                cache.set(key, (response.content, response['Content-Type']), page_timeout(timeout))
+                response['X-Page-Cache'] = 'miss'
+            return response
+        return wrapper
+    return decorator
+
+
+def page_validators(request, group):
+    """
+    匿名请求的 (ETag, 最后修改时间)，由 'all' 和页面所属分组的版本号得到
+    已登录用户或有待显示消息时返回 (None, None)，始终返回完整页面
+    结果保存在request上，ETag和Last-Modified只读取一次版本号
+    """
+    if not hasattr(request, '_page_validators'):
+        request._page_validators = (None, None)
+        if is_cacheable(request):
+            versions = group_versions(get_cache(), ('all', group))
+            changed_at = max(ts for _, ts in versions)
+            # 与整页缓存相同，副本可能读到旧数据时不提供校验值，避免浏览器以新ETag保存旧页面
+            if not replica_may_lag(changed_at):
+                etag = '-'.join(token[:16] for token, _ in versions)
+                request._page_validators = (etag, datetime.fromtimestamp(changed_at, tz=timezone.utc))
+    return request._page_validators
+
+
+def conditional_page(group):
+    """
+    视图装饰器：为匿名请求提供ETag/Last-Modified，匹配If-None-Match/If-Modified-Since时返回304
+    校验值在执行视图之前得到，不需要查询数据库、渲染Markdown或模板
+    """
+    def etag_func(request, *args, **kwargs):
+        return page_validators(request, resolve_group(group, args, kwargs))[0]
+
+    def last_modified_func(request, *args, **kwargs):
+        return page_validators(request, resolve_group(group, args, kwargs))[1]
+
+    def add_cache_control(response):
+        if response.has_header('ETag'):
+            # 允许浏览器保存页面，但每次使用前都需要重新验证
+            patch_cache_control(response, no_cache=True)
+        return response
+
+    def decorator(view_func):
+        conditional_view = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view_func)
+
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                # 校验值先在同步线程中得到并保存在request上，condition()随后直接读取，不会在事件循环中访问数据库
+                await sync_to_async(page_validators)(request, resolve_group(group, args, kwargs))
+                return add_cache_control(await conditional_view(request, *args, **kwargs))
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            return add_cache_control(conditional_view(request, *args, **kwargs))
+        return wrapper
+    return decorator
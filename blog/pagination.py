@@ -0,0 +1,188 @@
+"""
+游标（keyset）分页
+按排序字段的值定位下一页，不使用OFFSET，也不需要COUNT(*)，翻到第N页与第1页的开销相同
+"""
+import base64
+import binascii
+import json
+import math
+from datetime import date, datetime
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+def encode_cursor(payload):
+    """将游标数据编码为URL安全的不透明字符串"""
+    raw = json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """解码游标字符串，格式不正确时返回None"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw.decode('utf-8'))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(payload, dict) or not isinstance(payload.get('v'), list):
+        return None
+    return payload
+
+
+class KeysetPage:
+    """游标分页的一页，接口与Django的Page对象尽量保持一致"""
+
+    def __init__(self, object_list, paginator, number, has_next, has_previous, extra):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.number = number
+        self._has_next = has_next
+        self._has_previous = has_previous
+        # 随游标在各页之间传递的附加数据（例如搜索结果总数）
+        self.extra = extra
+
+    def __repr__(self):
+        return f'<KeysetPage {self.number}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def num_pages(self):
+        """已知结果总数时返回总页数，否则返回None"""
+        total = self.extra.get('total')
+        if total is None:
+            return None
+        return max(math.ceil(total / self.paginator.per_page), 1)
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return ''
+        return self.paginator.cursor_for(self.object_list[-1], 'n', self.number + 1, self.extra)
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return ''
+        return self.paginator.cursor_for(self.object_list[0], 'p', self.number - 1, self.extra)
+
+
+class KeysetPaginator:
+    """
+    基于排序字段值的游标分页
+    ordering的最后一个字段必须唯一（默认以id兜底），保证游标位置确定
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-created_at', '-pk')):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = list(ordering)
+
+    def get_page(self, token=None):
+        """按游标取一页；游标为空或无效时返回第一页"""
+        queryset, make_page = self._plan(token)
+        return make_page(list(queryset))
+
+    async def aget_page(self, token=None):
+        """get_page的异步版本，用于异步视图"""
+        queryset, make_page = self._plan(token)
+        return make_page([obj async for obj in queryset])
+
+    def _plan(self, token):
+        """根据游标确定要执行的查询，返回 (查询, 由查询结果生成KeysetPage的函数)"""
+        payload = decode_cursor(token) if token else None
+        values = self._parse_values(payload['v']) if payload else None
+
+        if values is None:
+            def first_page(rows):
+                return KeysetPage(rows[:self.per_page], self, 1, len(rows) > self.per_page, False, {})
+            return self.queryset.order_by(*self.ordering)[:self.per_page + 1], first_page
+
+        extra = payload.get('x') if isinstance(payload.get('x'), dict) else {}
+        number = payload.get('n') if isinstance(payload.get('n'), int) else 1
+
+        if payload.get('d') == 'p':
+            # 向前翻页：反向排序取数据后再倒回来
+            reversed_ordering = [self._flip(name) for name in self.ordering]
+            queryset = self.queryset.filter(self._after(values, reverse=True)).order_by(*reversed_ordering)
+
+            def previous_page(rows):
+                has_previous = len(rows) > self.per_page
+                return KeysetPage(rows[:self.per_page][::-1], self, max(number, 1), True, has_previous, extra)
+            return queryset[:self.per_page + 1], previous_page
+
+        queryset = self.queryset.filter(self._after(values, reverse=False)).order_by(*self.ordering)
+
+        def next_page(rows):
+            return KeysetPage(rows[:self.per_page], self, max(number, 2), len(rows) > self.per_page, True, extra)
+        return queryset[:self.per_page + 1], next_page
+
+    def cursor_for(self, obj, direction, number, extra):
+        """根据对象的排序字段值生成游标"""
+        values = []
+        for name in self.ordering:
+            value = getattr(obj, name.lstrip('-'))
+            if isinstance(value, (datetime, date)):
+                value = value.isoformat()
+            values.append(value)
+        return encode_cursor({'v': values, 'd': direction, 'n': number, 'x': extra})
+
+    @staticmethod
+    def _flip(name):
+        return name[1:] if name.startswith('-') else f'-{name}'
+
+    def _parse_values(self, raw_values):
+        """将游标中的值转换回字段类型，数量或格式不符时返回None"""
+        if len(raw_values) != len(self.ordering):
+            return None
+
+        values = []
+        for name, raw in zip(self.ordering, raw_values):
+            attr = name.lstrip('-')
+            try:
+                field = self.queryset.model._meta.pk if attr == 'pk' else self.queryset.model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                # 注解字段（如搜索相关度），只接受数字
+                if not isinstance(raw, (int, float)) or isinstance(raw, bool):
+                    return None
+                values.append(raw)
+                continue
+            try:
+                values.append(field.to_python(raw))
+            except ValidationError:
+                return None
+        return values
+
+    def _after(self, values, reverse):
+        """
+        构造"排在游标之后"的条件：f1 < v1 OR (f1 = v1 AND (f2 < v2 OR ...))
+        首个字段额外加上 f1 <= v1，数据库可以直接从游标位置开始范围扫描索引
+        """
+        pairs = list(zip(self.ordering, values))
+        condition = None
+        for name, value in reversed(pairs):
+            attr = name.lstrip('-')
+            descending = name.startswith('-') != reverse
+            strict = Q(**{f'{attr}__{"lt" if descending else "gt"}': value})
+            condition = strict if condition is None else strict | (Q(**{attr: value}) & condition)
+
+        name, value = pairs[0]
+        descending = name.startswith('-') != reverse
+        return Q(**{f'{name.lstrip("-")}__{"lte" if descending else "gte"}': value}) & condition
@@ -0,0 +1,102 @@
+"""
+Markdown渲染工具
+文章和评论共用同一套渲染配置，渲染结果保存在数据库中，页面访问时不再重复渲染
+"""
+import hashlib
+import json
+
+import markdown
+import pygments
+from django.conf import settings
+from django.core.cache import cache
+
+from .highlight import HighlightCacheExtension
+from .timing import track
+
+
+DEFAULT_EXTENSIONS = ['extra', 'codehilite', 'toc']
+
+# 渲染结果缓存时间（秒），缓存键已包含渲染器签名，配置变化后旧结果自然失效
+RENDER_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+
+def get_extensions():
+    """当前启用的Markdown扩展"""
+    return list(getattr(settings, 'MARKDOWN_EXTENSIONS', DEFAULT_EXTENSIONS))
+
+
+def get_extension_configs():
+    """当前的Markdown扩展配置"""
+    return dict(getattr(settings, 'MARKDOWN_EXTENSION_CONFIGS', {}))
+
+
+def renderer_signature():
+    """
+    渲染器签名
+    Markdown/Pygments版本或扩展配置变化时签名随之变化，用于判断已保存的HTML是否过期
+    """
+    payload = json.dumps({
+        'markdown': markdown.__version__,
+        'pygments': pygments.__version__,
+        'extensions': get_extensions(),
+        'configs': get_extension_configs(),
+    }, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def render_hash(text):
+    """内容 + 渲染器签名的校验值，两者任一变化都需要重新渲染"""
+    source = f'{renderer_signature()}\x00{text}'
+    return hashlib.sha1(source.encode('utf-8')).hexdigest()
+
+
+def create_markdown():
+    """按当前配置创建Markdown实例，代码块的高亮结果按内容缓存（见highlight.py）"""
+    return markdown.Markdown(
+        extensions=[*get_extensions(), HighlightCacheExtension(renderer_signature())],
+        extension_configs=get_extension_configs(),
+    )
+
+
+def render_markdown(text, md=None):
+    """
+    将Markdown转换为HTML
+    返回 (html, toc_html)，没有标题时toc_html为空字符串
+    传入md时会先reset()，避免toc、脚注等状态在多次转换之间泄漏
+    """
+    if md is None:
+        md = create_markdown()
+    else:
+        md.reset()
+
+    with track('markdown'):
+        html = md.convert(text)
+    toc_html = getattr(md, 'toc', '') if getattr(md, 'toc_tokens', None) else ''
+    return html, toc_html
+
+
+def render_markdown_batch(texts):
+    """
+    批量渲染多段Markdown（用于评论），返回与texts顺序一致的HTML列表
+    结果按内容校验值缓存，相同内容只渲染一次；
+    未命中缓存的内容共用一个Markdown实例，每次转换前都会reset()
+    """
+    keys = [f'markdown:{render_hash(text)}' for text in texts]
+    cached = cache.get_many(keys)
+
+    md = None
+    rendered = {}
+    results = []
+    for key, text in zip(keys, texts):
+        if key in cached:
+            results.append(cached[key])
+            continue
+        if key not in rendered:
+            if md is None:
+                md = create_markdown()
+            rendered[key], _ = render_markdown(text, md)
+        results.append(rendered[key])
+
+    if rendered:
+        cache.set_many(rendered, RENDER_CACHE_TIMEOUT)
+    return results
@@ -0,0 +1,161 @@
+"""
+主库/只读副本路由
+由 read_from_replica 装饰的只读视图处理GET/HEAD请求时，查询从只读副本读取，其余读写都使用主库
+请求中发生过写入（发表评论、编辑文章、导入、登录等）时，响应设置一个短期Cookie，
+该浏览器在 BLOG_REPLICA_STICKY_SECONDS 秒内的请求都从主库读取，副本有复制延迟时也能看到自己刚写入的内容
+
+副本的数据库别名由 BLOG_DATABASE_REPLICAS 设置，为空时所有查询都使用主库
+"""
+import random
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+
+PRIMARY_COOKIE = 'blog_primary'
+DEFAULT_STICKY_SECONDS = 10
+
+_current_state = ContextVar('blog_db_routing', default=None)
+
+
+def get_replicas():
+    return list(getattr(settings, 'BLOG_DATABASE_REPLICAS', []))
+
+
+def sticky_seconds():
+    return getattr(settings, 'BLOG_REPLICA_STICKY_SECONDS', DEFAULT_STICKY_SECONDS)
+
+
+class RoutingState:
+    """一个请求的路由状态"""
+
+    def __init__(self, pinned):
+        # 近期写入过：整个请求都使用主库
+        self.pinned = pinned
+        # 只读视图执行期间使用的副本别名
+        self.replica = None
+        # 本次请求是否写入过数据库
+        self.wrote = False
+
+    @property
+    def read_alias(self):
+        if self.pinned or self.wrote:
+            return None
+        return self.replica
+
+
+def reading_from_replica():
+    """当前查询是否从副本读取"""
+    state = _current_state.get()
+    return state is not None and state.read_alias is not None
+
+
+def replica_may_lag(changed_at):
+    """当前请求从副本读取，且数据在changed_at（时间戳）刚刚变化过：副本可能还没有同步，读到的是旧数据"""
+    return reading_from_replica() and time.time() - changed_at < sticky_seconds()
+
+
+class PrimaryReplicaRouter:
+    """写入和请求之外的查询使用主库，只读视图中的查询使用副本"""
+
+    def db_for_read(self, model, **hints):
+        state = _current_state.get()
+        if state is None:
+            return None
+        return state.read_alias
+
+    def db_for_write(self, model, **hints):
+        state = _current_state.get()
+        if state is not None:
+            # 写入之后本请求的读取也回到主库
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # 副本与主库的数据相同
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in get_replicas():
+            return False
+        return None
+
+
+def read_from_replica(view_func):
+    """视图装饰器：GET/HEAD请求的查询从副本读取，每个请求随机选择一个副本"""
+    def start(request):
+        state = _current_state.get()
+        if state is None or request.method not in ('GET', 'HEAD'):
+            return None
+        state.replica = random.choice(get_replicas())
+        return state
+
+    def stop(state):
+        if state is not None:
+            state.replica = None
+
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            state = start(request)
+            try:
+                return await view_func(request, *args, **kwargs)
+            finally:
+                stop(state)
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        state = start(request)
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            stop(state)
+    return wrapper
+
+
+class ReplicaRoutingMiddleware:
+    """
+    为每个请求建立路由状态，请求中写入过数据库时设置保持使用主库的Cookie
+    应放在SessionMiddleware之前，会话的读取和保存（例如登录）也按路由状态处理
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not get_replicas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        state = RoutingState(pinned=PRIMARY_COOKIE in request.COOKIES)
+        token = _current_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_state.reset(token)
+        return self.finish(state, response)
+
+    async def __acall__(self, request):
+        state = RoutingState(pinned=PRIMARY_COOKIE in request.COOKIES)
+        token = _current_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_state.reset(token)
+        return self.finish(state, response)
+
+    def finish(self, state, response):
+        if state.wrote:
+            response.set_cookie(PRIMARY_COOKIE, '1', max_age=sticky_seconds(), httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,50 @@
+"""
+博客模型信号处理
+"""
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import Comment, Post, Tag
+from .pagecache import FEED_GROUP, LIST_GROUP, SITEMAP_GROUP, invalidate, post_group
+from .sitemaps import post_chunk_group
+
+
+@receiver(pre_delete, sender=Post)
+def decrement_tag_counts(sender, instance, **kwargs):
+    """删除已发布文章前，减少其标签的文章计数（关联记录随后被级联删除）"""
+    if instance.is_published:
+        Tag.objects.filter(posts=instance).update(post_count=Greatest(F('post_count') - 1, 0))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, **kwargs):
+    """文章变化时清除其详情页、列表、搜索和标签页、订阅以及站点地图索引和所在段的缓存"""
+    invalidate(post_group(instance.pk), LIST_GROUP, FEED_GROUP, SITEMAP_GROUP, post_chunk_group(instance.pk))
+
+
+@receiver(post_save, sender=Comment)
+def increment_comment_count(sender, instance, created, **kwargs):
+    """新增评论时文章评论数加一"""
+    if created:
+        Post.objects.filter(pk=instance.post_id).update(comment_count=F('comment_count') + 1)
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comment_count(sender, instance, origin=None, **kwargs):
+    """
+    删除评论时文章评论数减一；删除父评论时级联删除的每条回复都会触发一次
+    删除文章引起的级联删除无需更新
+    """
+    if isinstance(origin, Post) or getattr(origin, 'model', None) is Post:
+        return
+    Post.objects.filter(pk=instance.post_id).update(comment_count=Greatest(F('comment_count') - 1, 0))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, **kwargs):
+    """评论变化时清除所属文章详情页的缓存，列表类页面显示评论数，也一并清除"""
+    invalidate(post_group(instance.post_id), LIST_GROUP)
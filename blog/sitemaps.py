@@ -0,0 +1,125 @@
+"""
+站点地图
+sitemap.xml是站点地图索引，按文章ID分段列出各段站点地图（sitemap-posts-<段号>.xml），
+第n段包含ID在 [n*段大小, (n+1)*段大小) 范围内的已发布文章（段大小由BLOG_SITEMAP_CHUNK_SIZE设置）
+按ID范围分段而不是按偏移量分页：读取任意一段都是主键上的范围扫描，
+新文章只会进入最后几段，编辑或删除文章也只影响它所在的一段
+
+各段使用服务器端游标逐批读取并以流式响应输出（ASGI下同样逐块发送），不会把整段文章读入内存；
+生成的内容按段缓存（每段属于自己的缓存分组），只有段内文章变化时才重新生成
+"""
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db import router
+from django.db.models import F, Max
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+
+from .models import Post
+from .pagecache import (
+    SITEMAP_GROUP, cache_anonymous_page, cached_response, conditional_page, get_cache, page_key,
+)
+from .routers import read_from_replica, replica_may_lag
+from .streaming import streaming_response
+
+
+# 站点地图协议规定每个文件最多50000个URL
+DEFAULT_CHUNK_SIZE = 10000
+DEFAULT_TIMEOUT = 60 * 60 * 24
+ITERATOR_CHUNK_SIZE = 2000
+
+CONTENT_TYPE = 'application/xml; charset=utf-8'
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+XMLNS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+
+def chunk_size():
+    return getattr(settings, 'BLOG_SITEMAP_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+
+
+def sitemap_timeout():
+    return getattr(settings, 'BLOG_SITEMAP_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+
+
+def chunk_group(chunk):
+    """一段站点地图的缓存分组；分组名包含段大小，修改段大小后旧的缓存不会再被使用"""
+    return f'sitemap:{chunk_size()}:{chunk}'
+
+
+def post_chunk_group(pk):
+    """文章所在段的缓存分组"""
+    return chunk_group(pk // chunk_size())
+
+
+def published_chunk(chunk):
+    size = chunk_size()
+    return Post.objects.filter(is_published=True, pk__gte=chunk * size, pk__lt=(chunk + 1) * size)
+
+
+def lastmod(value):
+    return value.isoformat(timespec='seconds')
+
+
+@read_from_replica
+@conditional_page(SITEMAP_GROUP)
+@cache_anonymous_page(SITEMAP_GROUP, timeout=sitemap_timeout())
+def sitemap_index(request):
+    """站点地图索引：每段一条，lastmod为段内文章最近的更新时间"""
+    chunks = (
+        Post.objects.filter(is_published=True)
+        .annotate(chunk=F('pk') / chunk_size())
+        .values('chunk')
+        .annotate(lastmod=Max('updated_at'))
+        .order_by('chunk')
+    )
+    parts = [XML_HEADER, f'<sitemapindex xmlns="{XMLNS}">\n']
+    for row in chunks:
+        location = escape(request.build_absolute_uri(reverse('sitemap_chunk', args=[row['chunk']])))
+        parts.append(f'<sitemap><loc>{location}</loc><lastmod>{lastmod(row["lastmod"])}</lastmod></sitemap>\n')
+    parts.append('</sitemapindex>\n')
+    return HttpResponse(''.join(parts), content_type=CONTENT_TYPE)
+
+
+def stream_chunk(request, posts, store):
+    """逐批输出一段站点地图，输出完毕后调用store(完整内容)写入缓存"""
+    parts = [XML_HEADER, f'<urlset xmlns="{XMLNS}">\n']
+    yield ''.join(parts)
+
+    batch = []
+    for pk, updated_at in posts.values_list('pk', 'updated_at').order_by('pk').iterator(ITERATOR_CHUNK_SIZE):
+        location = escape(request.build_absolute_uri(reverse('post_detail', args=[pk])))
+        batch.append(f'<url><loc>{location}</loc><lastmod>{lastmod(updated_at)}</lastmod></url>\n')
+        if len(batch) >= ITERATOR_CHUNK_SIZE:
+            parts.append(''.join(batch))
+            yield parts[-1]
+            batch = []
+
+    parts.append(''.join(batch) + '</urlset>\n')
+    yield parts[-1]
+    store(''.join(parts).encode('utf-8'))
+
+
+@read_from_replica
+@conditional_page(chunk_group)
+def sitemap_chunk(request, chunk):
+    """一段站点地图；缓存命中时直接返回，否则流式生成并在输出完毕后写入缓存"""
+    cache = get_cache()
+    key, changed_at = page_key(cache, request, chunk_group(chunk))
+    cached = cache.get(key)
+    if cached is not None:
+        return cached_response(cached)
+
+    # 内容在视图返回后才生成，这里先确定数据库，生成时仍从副本读取
+    posts = published_chunk(chunk).using(router.db_for_read(Post))
+    if not posts.exists():
+        raise Http404('站点地图不存在')
+
+    # 与整页缓存相同，段内数据刚刚变化、副本可能还没有同步时不缓存
+    storable = not replica_may_lag(changed_at)
+
+    def store(content):
+        if storable:
+            cache.set(key, (content, CONTENT_TYPE), sitemap_timeout())
+
+    return streaming_response(request, stream_chunk(request, posts, store), content_type=CONTENT_TYPE)
@@ -0,0 +1,55 @@
+"""
+静态文件
+WhiteNoiseMiddleware只能同步调用，放在中间件链中时，ASGI下整条中间件链都会退回到同步适配器中执行，
+每个请求都要占用一个线程，异步视图也就失去了意义
+StaticFilesMiddleware同时支持同步和异步调用：WSGI下与WhiteNoiseMiddleware完全相同；
+ASGI下只有命中静态文件的请求在线程中读取文件，其余请求直接交给后面的异步中间件和视图
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """由WhiteNoise提供静态文件（压缩版本、长期缓存头等配置不变），同时支持WSGI和ASGI"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            # 开发环境每次都在磁盘上查找文件
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is None:
+            return await self.get_response(request)
+        return await sync_to_async(self.serve_content, thread_sensitive=False)(static_file, request)
+
+    @staticmethod
+    def serve_content(static_file, request):
+        """
+        与serve相同，但把文件内容读入内存后返回普通响应
+        ASGI下FileResponse的同步迭代器同样会被整个读入内存（并产生警告），静态文件都不大，直接读取即可
+        """
+        response = static_file.get_response(request.method, request.META)
+        content = b''
+        if response.file is not None:
+            with response.file:
+                content = response.file.read()
+        http_response = HttpResponse(content, status=int(response.status))
+        del http_response['Content-Type']
+        for key, value in response.headers:
+            http_response[key] = value
+        return http_response
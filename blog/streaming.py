@@ -0,0 +1,29 @@
+"""
+流式响应
+WSGI下StreamingHttpResponse边迭代边发送；ASGI下Django会先把同步迭代器整个读入内存再发送，
+需要改用异步迭代器。这里把同步迭代器包装为异步迭代器，每次在同步线程中取下一块（迭代器中可以查询数据库）
+
+迭代器在视图返回之后才执行，此时read_from_replica已经恢复了路由状态，
+需要从副本读取的查询应在视图中用 .using(router.db_for_read(...)) 确定数据库
+"""
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+
+async def iterate_in_thread(iterator):
+    """把同步迭代器转换为异步迭代器"""
+    sentinel = object()
+    try:
+        while (chunk := await sync_to_async(next)(iterator, sentinel)) is not sentinel:
+            yield chunk
+    finally:
+        # 客户端中途断开时也要关闭迭代器，释放数据库游标
+        await sync_to_async(iterator.close)()
+
+
+def streaming_response(request, iterator, **kwargs):
+    """逐块输出iterator的StreamingHttpResponse，ASGI请求下转换为异步迭代器"""
+    if isinstance(request, ASGIRequest):
+        iterator = iterate_in_thread(iterator)
+    return StreamingHttpResponse(iterator, **kwargs)
@@ -1,5 +1,7 @@
 from django import template
 
+from blog.models import parse_tags
+
 register = template.Library()
 
 
@@ -11,4 +13,7 @@ def split_tags(value, delimiter=','):
     """
     if not value:
         return []
+    if delimiter == ',':
+        # 与Tag模型的解析规则保持一致（同时支持中文逗号）
+        return parse_tags(value)
     return [tag.strip() for tag in value.split(delimiter) if tag.strip()]
@@ -1,3 +1,1296 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import frontmatter
+import markdown
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.db import connection, router, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from markdown.extensions import codehilite
+
+from . import highlight, importers, jobs, models, pagecache, rendering, views
+from .importers import get_worker_count, import_zip
+from .jobs import (
+    REQUEUE_INTERVAL, STALE_AFTER, claim_next_job, create_import_job, requeue_stale_jobs, run_job, run_worker,
+)
+from .models import Comment, ImportJob, Post, Tag
+from .pagination import KeysetPaginator, decode_cursor, encode_cursor
+from .routers import PRIMARY_COOKIE, ReplicaRoutingMiddleware, read_from_replica
+from .search import apply_search
+
+
+PLAN_TABLES = ('blog_post', 'blog_comment', 'blog_tag')
+
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'pages': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+    'highlight': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'highlight'},
+}
+
+# 测试前不执行collectstatic，静态文件不使用manifest
+TEST_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+def iter_plan_nodes(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from iter_plan_nodes(child)
+
+
+# 查询计划在主库上检查，不使用只读副本
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES, BLOG_DATABASE_REPLICAS=[])
+class QueryPlanTests(TestCase):
+    """
+    检查公开页面的查询都能使用索引
+    在构造的数据上对每个视图执行的查询运行EXPLAIN，出现对blog_post/blog_comment/blog_tag的顺序扫描即失败
+    测试数据量远小于线上，为避免规划器因表小而直接选择顺序扫描，执行EXPLAIN前关闭enable_seqscan：
+    此时计划中仍出现顺序扫描，说明没有可用的索引
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', password='password')
+        posts = Post.objects.bulk_create([
+            Post(
+                title=f'文章 {index}',
+                content=f'正文 {index}',
+                excerpt=f'正文 {index}',
+                tags=f'Python, 标签{index % 20}',
+                category=f'分类{index % 5}',
+                author=cls.author,
+                is_published=index % 10 != 0,
+            )
+            for index in range(2000)
+        ])
+        Post.sync_tags_bulk(posts)
+
+        cls.post = Post.objects.create(title='查询计划', content='评论很多的文章', tags='Python', author=cls.author)
+        parent = None
+        for index in range(30):
+            parent = Comment.objects.create(
+                post=cls.post, author=cls.author, content=f'评论 {index}', parent=parent if index % 3 else None
+            )
+
+        comments = Comment.objects.bulk_create([
+            Comment(post=posts[index % len(posts)], author=cls.author, content=f'评论 {index}')
+            for index in range(3000)
+        ])
+        for comment in comments:
+            comment.path = comment.build_path()
+        Comment.objects.bulk_update(comments, ['path'])
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE blog_post, blog_comment, blog_tag, blog_post_tag_objects')
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+            plan = cursor.fetchone()[0]
+            cursor.execute('SET LOCAL enable_seqscan = on')
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]['Plan']
+
+    def assertNoSeqScan(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+
+        checked = 0
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT') or not any(f'"{table}"' in sql for table in PLAN_TABLES):
+                continue
+            checked += 1
+            for node in iter_plan_nodes(self.explain(sql)):
+                if node['Node Type'] == 'Seq Scan':
+                    self.assertNotIn(node.get('Relation Name'), PLAN_TABLES, f'{url} 的查询使用了顺序扫描:\n{sql}')
+        self.assertGreater(checked, 0)
+
+    def test_post_list(self):
+        self.assertNoSeqScan('/')
+        page = self.client.get('/').context['page_obj']
+        self.assertNoSeqScan(f'/?cursor={page.next_cursor}')
+
+    def test_post_detail(self):
+        self.assertNoSeqScan(f'/post/{self.post.pk}/')
+
+    def test_search(self):
+        self.assertNoSeqScan('/search/?q=文章')
+
+    def test_tag_cloud(self):
+        self.assertNoSeqScan('/tags/')
+        self.assertNoSeqScan('/tags/?tag=标签3')
+
+    def test_feeds(self):
+        self.assertNoSeqScan('/feeds/')
+        self.assertNoSeqScan('/feeds/tag/标签3/')
+        self.assertNoSeqScan('/feeds/category/分类3/')
+
+    def test_sitemap(self):
+        self.assertNoSeqScan('/sitemap.xml')
+        self.assertNoSeqScan(f'/sitemap-posts-{self.post.pk // 10000}.xml')
+
+
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES, BLOG_DATABASE_REPLICAS=[])
+class SearchTests(TestCase):
+    """全文检索：字段权重决定排序，中文按二元组匹配，结果总数由窗口函数统计并随游标传递"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', password='password')
+        # 正文命中的文章发布得更晚，只有按权重排序时标题命中的文章才会排在前面
+        cls.title_match = cls.create_post('数据库索引设计', '无关的内容', hours=2)
+        cls.body_match = cls.create_post('读书笔记', '数据库索引 数据库索引 数据库索引', hours=1)
+        cls.create_post('缓存', '页面缓存与失效', hours=3)
+        cls.create_post('数据库索引草稿', '数据库索引', hours=0, is_published=False)
+        for index in range(11):
+            cls.create_post(f'PostgreSQL 笔记 {index}', '查询计划与索引', hours=10 + index)
+
+    @classmethod
+    def create_post(cls, title, content, hours, **kwargs):
+        return Post.objects.create(
+            title=title, content=content, author=cls.author,
+            created_at=timezone.now() - timedelta(hours=hours), **kwargs
+        )
+
+    def search(self, text):
+        return list(apply_search(Post.objects.filter(is_published=True), text))
+
+    def test_title_match_outranks_body_match(self):
+        results = self.search('数据库索引')
+        self.assertEqual(results, [self.title_match, self.body_match])
+        self.assertGreater(results[0].rank, results[1].rank)
+
+    def test_chinese_bigram_matching(self):
+        # 词组内部的任意两字都能命中，词序不同的短语不会命中
+        self.assertEqual(self.search('据库'), [self.title_match, self.body_match])
+        self.assertEqual(self.search('索引设计'), [self.title_match])
+        self.assertEqual(self.search('设计索引'), [])
+        self.assertEqual(self.search('缓'), [Post.objects.get(title='缓存')])
+        self.assertEqual(len(self.search('postgres 计划')), 11)
+        self.assertEqual(self.search('！？'), [])
+
+    def test_total_results(self):
+        response = self.client.get('/search/', {'q': '数据库'})
+        self.assertEqual(response.context['total_results'], 2)
+        self.assertEqual(list(response.context['page_obj']), [self.title_match, self.body_match])
+        self.assertContains(response, '<span class="font-semibold">2</span>', html=True)
+
+        response = self.client.get('/search/', {'q': '不存在的词'})
+        self.assertEqual(response.context['total_results'], 0)
+
+    def test_total_carried_in_cursor(self):
+        response = self.client.get('/search/', {'q': '索引'})
+        page = response.context['page_obj']
+        self.assertEqual(response.context['total_results'], 13)
+        self.assertEqual(len(page), 10)
+        self.assertEqual(decode_cursor(page.next_cursor)['x'], {'total': 13})
+
+        # 第二页直接使用游标中的总数，之后新增的文章不影响显示的总数
+        self.create_post('索引', '新文章', hours=0)
+        response = self.client.get('/search/', {'q': '索引', 'cursor': page.next_cursor})
+        self.assertEqual(response.context['total_results'], 13)
+        self.assertEqual(len(response.context['page_obj']), 3)
+        self.assertEqual(response.context['page_obj'].number, 2)
+
+
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES, BLOG_DATABASE_REPLICAS=[])
+class KeysetPaginationTests(TestCase):
+    """游标分页：相同发布时间的文章按id确定先后，前后翻页不重复、不遗漏，无效游标回到第一页"""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user('author', password='password')
+        moments = [timezone.now() - timedelta(hours=hours) for hours in (1, 1, 1, 2, 3, 3, 4)]
+        for index, created_at in enumerate(moments):
+            Post.objects.create(title=f'文章{index}', content='正文', author=author, created_at=created_at)
+        cls.expected = list(Post.objects.order_by('-created_at', '-pk').values_list('pk', flat=True))
+
+    def paginator(self):
+        return KeysetPaginator(Post.objects.all(), 3)
+
+    def test_cursor_round_trip(self):
+        payload = {'v': ['2026-01-01T00:00:00+00:00', 12], 'd': 'n', 'n': 2, 'x': {'q': '数据库'}}
+        self.assertEqual(decode_cursor(encode_cursor(payload)), payload)
+        self.assertNotIn('=', encode_cursor(payload))
+
+    def test_walk_forward_and_back_across_ties(self):
+        paginator = self.paginator()
+        pages = [paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        self.assertEqual([post.pk for page in pages for post in page], self.expected)
+        self.assertEqual([page.number for page in pages], [1, 2, 3])
+        self.assertFalse(pages[0].has_previous())
+
+        previous = paginator.get_page(pages[-1].previous_cursor)
+        self.assertEqual([post.pk for post in previous], [post.pk for post in pages[1]])
+        self.assertEqual(previous.number, 2)
+        first = paginator.get_page(previous.previous_cursor)
+        self.assertEqual([post.pk for post in first], self.expected[:3])
+        self.assertFalse(first.has_previous())
+
+    def test_invalid_cursor_returns_first_page(self):
+        paginator = self.paginator()
+        for token in ('!!!', encode_cursor(['not', 'a', 'dict']), encode_cursor({'v': [1]}),
+                      encode_cursor({'v': ['yesterday', 1], 'd': 'n'})):
+            page = paginator.get_page(token)
+            self.assertEqual([post.pk for post in page], self.expected[:3])
+            self.assertEqual(page.number, 1)
+        self.assertEqual(self.client.get('/?cursor=!!!').status_code, 200)
+
+
+@override_settings(BLOG_IMPORT_WORKERS=8, BLOG_IMPORT_MIN_FILES_PER_WORKER=50)
+class ImportWorkerCountTests(SimpleTestCase):
+    """文件较少的导入不启动解析进程"""
+
+    def test_scales_with_file_count(self):
+        self.assertEqual(get_worker_count(total=1), 1)
+        self.assertEqual(get_worker_count(total=120), 2)
+        self.assertEqual(get_worker_count(total=10000), 8)
+        self.assertEqual(get_worker_count(), 8)
+
+    def test_explicit_workers_are_kept(self):
+        self.assertEqual(get_worker_count(4, total=1), 4)
+
+
+@override_settings(BLOG_DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(SimpleTestCase):
+    """只读视图的GET请求从副本读取，写入后本请求和之后一段时间内的请求都回到主库"""
+
+    def request(self, method='get', cookies=None, write=False):
+        seen = {}
+
+        @read_from_replica
+        def view(request):
+            if write:
+                router.db_for_write(Post)
+            seen['read'] = Post.objects.all().db
+            return HttpResponse()
+
+        request = getattr(RequestFactory(), method)('/')
+        request.COOKIES.update(cookies or {})
+        response = ReplicaRoutingMiddleware(view)(request)
+        return seen['read'], PRIMARY_COOKIE in response.cookies
+
+    def test_get_reads_from_replica(self):
+        self.assertEqual(self.request(), ('replica', False))
+
+    def test_post_reads_from_primary(self):
+        self.assertEqual(self.request('post'), ('default', False))
+
+    def test_write_pins_to_primary(self):
+        self.assertEqual(self.request(write=True), ('default', True))
+        self.assertEqual(self.request(cookies={PRIMARY_COOKIE: '1'}), ('default', False))
+
+    def test_outside_request_uses_primary(self):
+        self.assertEqual(Post.objects.all().db, 'default')
+
+
+# DEBUG下Django会为每个被适配到同步/异步的中间件记录一条django.request日志；配置副本，加载全部中间件
+@override_settings(DEBUG=True, BLOG_DATABASE_REPLICAS=['replica'], STORAGES=TEST_STORAGES)
+class AsyncHandlerTests(SimpleTestCase):
+    """ASGI下中间件链全部以异步方式执行，不会退回到同步适配器"""
+
+    def test_no_middleware_adapted(self):
+        with self.assertNoLogs('django.request', 'DEBUG'):
+            ASGIHandler()
+            WSGIHandler()
+
+    async def test_serves_static_files(self):
+        response = await self.async_client.get('/static/css/blog.css')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/css; charset="utf-8"')
+        self.assertIn(b'--tw', response.content)
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+
+
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES, BLOG_DATABASE_REPLICAS=[])
+class AsyncViewTests(TestCase):
+    """只读页面是异步视图，ASGI下在请求所在的协程中直接执行，中间件不会把它放到同步线程中"""
+
+    async def test_post_list_runs_as_coroutine(self):
+        self.assertTrue(asyncio.iscoroutinefunction(resolve('/').func))
+
+        tasks = []
+        render_async = views.render_async
+
+        async def record_task(*args):
+            tasks.append(asyncio.current_task())
+            return await render_async(*args)
+
+        # 被适配为同步的中间件会通过async_to_sync在另一个任务中执行视图
+        with mock.patch.object(views, 'render_async', record_task):
+            response = await self.async_client.get('/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(tasks, [asyncio.current_task()])
+
+
+@override_settings(
+    CACHES=TEST_CACHES, STORAGES=TEST_STORAGES, BLOG_DATABASE_REPLICAS=[],
+    BLOG_SERVER_TIMING=True, BLOG_SERVER_TIMING_LOG=False,
+)
+class ServerTimingTests(TestCase):
+    """Server-Timing头包含查询次数和数据库、Markdown、模板、总耗时，同步和异步请求都能统计"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', password='password')
+        cls.post = Post.objects.create(title='文章', content='# 标题\n\n正文', author=cls.author)
+        Comment.objects.create(post=cls.post, author=cls.author, content='评论')
+
+    def setUp(self):
+        # 详情页补做渲染时才会统计到Markdown耗时
+        Post.objects.filter(pk=self.post.pk).update(render_hash='')
+        self.url = f'/post/{self.post.pk}/'
+
+    def parse(self, response):
+        """返回 {名称: (耗时毫秒, 说明)}"""
+        metrics = {}
+        for entry in response['Server-Timing'].split(', '):
+            name, duration, description = entry.split(';')
+            metrics[name] = (float(duration.removeprefix('dur=')), description.removeprefix('desc=').strip('"'))
+        return metrics
+
+    def assertTimings(self, metrics, queries):
+        self.assertEqual(list(metrics), ['db', 'markdown', 'template', 'total'])
+        self.assertEqual(metrics['db'][1], f'Database ({queries} queries)')
+        self.assertGreater(metrics['markdown'][0], 0)
+        self.assertGreater(metrics['template'][0], 0)
+        self.assertGreaterEqual(metrics['total'][0], max(duration for duration, _ in metrics.values()))
+
+    def test_sync_request(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTimings(self.parse(response), len(queries))
+
+    async def test_async_request(self):
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        # 文章、写回渲染结果、评论
+        self.assertTimings(self.parse(response), 3)
+
+    @override_settings(BLOG_SERVER_TIMING_LOG=True)
+    def test_log(self):
+        with self.assertLogs('blog.timing', 'INFO') as logs:
+            response = self.client.get(self.url)
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual((entry['path'], entry['status']), (self.url, 200))
+        self.assertEqual(f"Database ({entry['queries']} queries)", self.parse(response)['db'][1])
+
+    @override_settings(BLOG_SERVER_TIMING=False)
+    def test_disabled(self):
+        self.assertFalse(self.client.get(self.url).has_header('Server-Timing'))
+        self.assertFalse(self.client.get('/').has_header('Server-Timing'))
+
+
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES, BLOG_DATABASE_REPLICAS=[])
+class PostRenderTests(TestCase):
+    """文章保存时预渲染HTML和目录，内容或渲染器签名变化时才重新渲染"""
+
+    CONTENT = '# 标题\n\n正文 **加粗**\n\n```python\nprint(1)\n```'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', password='password')
+
+    def test_save_renders_html_and_toc(self):
+        post = Post.objects.create(title='文章', content=self.CONTENT, author=self.author)
+        post = Post.objects.get(pk=post.pk)
+        self.assertIn('<strong>加粗</strong>', post.content_html)
+        self.assertIn('class="codehilite"', post.content_html)
+        self.assertIn('href="#_1"', post.toc_html)
+        self.assertEqual(post.render_hash, rendering.render_hash(self.CONTENT))
+
+        post = Post.objects.create(title='没有标题', content='正文', author=self.author)
+        self.assertEqual(post.toc_html, '')
+
+    def test_rerenders_only_when_stale(self):
+        post = Post.objects.create(title='文章', content=self.CONTENT, author=self.author)
+        with mock.patch.object(models, 'render_markdown', wraps=models.render_markdown) as render:
+            post.title = '新标题'
+            post.save()
+            self.assertEqual(render.call_count, 0)
+
+            # 保存的校验值为空或与当前内容不符时重新渲染
+            Post.objects.filter(pk=post.pk).update(content_html='旧', render_hash='')
+            post = Post.objects.get(pk=post.pk)
+            post.save()
+            self.assertEqual(render.call_count, 1)
+
+            Post.objects.filter(pk=post.pk).update(content_html='旧', render_hash='0' * 40)
+            post = Post.objects.get(pk=post.pk)
+            post.save()
+            self.assertEqual(render.call_count, 2)
+
+            # 渲染配置变化（签名不同）时同样视为过期
+            with mock.patch.object(rendering, 'renderer_signature', return_value='upgraded'):
+                self.assertTrue(post.render_content())
+            self.assertEqual(render.call_count, 3)
+
+        post.refresh_from_db()
+        self.assertIn('<strong>加粗</strong>', post.content_html)
+
+    def test_rerender_posts_only_touches_stale_rows(self):
+        fresh = Post.objects.create(title='未变化', content='正文', author=self.author)
+        stale = Post.objects.create(title='校验值为空', content=self.CONTENT, author=self.author)
+        outdated = Post.objects.create(title='校验值过期', content='**正文**', author=self.author)
+        updated_at = timezone.now() - timedelta(days=30)
+        # 未过期的文章写入标记内容，重新渲染过就会被覆盖
+        Post.objects.filter(pk=fresh.pk).update(content_html='标记')
+        Post.objects.filter(pk=stale.pk).update(content_html='', toc_html='', render_hash='')
+        Post.objects.filter(pk=outdated.pk).update(content_html='旧', render_hash='0' * 40)
+        Post.objects.update(updated_at=updated_at)
+
+        stdout = io.StringIO()
+        call_command('rerender_posts', skip_comments=True, stdout=stdout)
+        self.assertIn('已检查 3 条文章，重新渲染 2 条', stdout.getvalue())
+
+        posts = Post.objects.in_bulk()
+        self.assertEqual(posts[fresh.pk].content_html, '标记')
+        self.assertIn('<strong>加粗</strong>', posts[stale.pk].content_html)
+        self.assertIn('href="#_1"', posts[stale.pk].toc_html)
+        self.assertEqual(posts[outdated.pk].content_html, '<p><strong>正文</strong></p>')
+        self.assertEqual({post.updated_at for post in posts.values()}, {updated_at})
+
+        call_command('rerender_posts', skip_comments=True, force=True, stdout=stdout)
+        self.assertEqual(Post.objects.get(pk=fresh.pk).content_html, '<p>正文</p>')
+        self.assertEqual(Post.objects.get(pk=fresh.pk).updated_at, updated_at)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class HighlightCacheTests(SimpleTestCase):
+    """代码块高亮缓存：输出与不带缓存的Markdown完全一致，编辑文章时只重新高亮改动过的代码块"""
+
+    BLOCKS = [
+        '```python\ndef hello():\n    return "你好"\n```',
+        '```\nSELECT * FROM blog_post;\n```',
+        '~~~{.js hl_lines="2"}\nconst a = 1;\nconst b = a + 1;\n~~~',
+        '    :::bash\n    echo "缩进代码块"',
+    ]
+
+    def setUp(self):
+        caches['highlight'].clear()
+        self.enterContext(mock.patch.object(highlight, '_local_cache', highlight.LRUCache(100)))
+        self.highlight = self.enterContext(
+            mock.patch.object(codehilite, 'highlight', wraps=codehilite.highlight)
+        )
+
+    def document(self, blocks):
+        return '# 代码\n\n' + '\n\n正文段落\n\n'.join(blocks) + '\n'
+
+    def uncached(self, text):
+        return markdown.markdown(
+            text, extensions=rendering.get_extensions(), extension_configs=rendering.get_extension_configs()
+        )
+
+    def test_matches_uncached_markdown(self):
+        text = self.document([*self.BLOCKS, self.BLOCKS[0], '```python\n未闭合的代码块'])
+        expected = self.uncached(text)
+        self.assertEqual(rendering.render_markdown(text)[0], expected)
+        # 第二次全部命中缓存
+        self.highlight.reset_mock()
+        self.assertEqual(rendering.render_markdown(text)[0], expected)
+        self.assertEqual(self.highlight.call_count, 0)
+
+    def test_edit_rehighlights_one_block(self):
+        rendering.render_markdown(self.document(self.BLOCKS))
+        self.assertEqual(self.highlight.call_count, len(self.BLOCKS))
+
+        for index, edited in ((1, '```\nSELECT id FROM blog_post;\n```'), (3, '    :::bash\n    echo "已修改"')):
+            blocks = list(self.BLOCKS)
+            blocks[index] = edited
+            text = self.document(blocks)
+            self.highlight.reset_mock()
+            html, _ = rendering.render_markdown(text)
+            self.assertEqual(self.highlight.call_count, 1)
+            self.assertEqual(html, self.uncached(text))
+
+    def test_shared_cache(self):
+        # 其他进程写入共享缓存后，本进程的进程内缓存为空也不需要重新高亮
+        rendering.render_markdown(self.document(self.BLOCKS))
+        self.highlight.reset_mock()
+        with mock.patch.object(highlight, '_local_cache', highlight.LRUCache(100)):
+            rendering.render_markdown(self.document(self.BLOCKS))
+        self.assertEqual(self.highlight.call_count, 0)
+
+
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES, BLOG_DATABASE_REPLICAS=[])
+class CommentCountTests(TestCase):
+    """文章的评论数随评论新增、删除（包括级联删除的回复）增减，save()不会用旧值覆盖"""
+
+    def setUp(self):
+        self.author = User.objects.create_user('author', password='password')
+        self.post = Post.objects.create(title='文章', content='正文', author=self.author)
+        self.parent = self.reply(None)
+        child = self.reply(self.parent)
+        self.reply(child)
+        self.reply(self.parent)
+        self.other = self.reply(None)
+
+    def reply(self, parent):
+        return Comment.objects.create(post=self.post, author=self.author, parent=parent, content='评论')
+
+    def count(self):
+        return Post.objects.get(pk=self.post.pk).comment_count
+
+    def test_counts_new_comments(self):
+        self.assertEqual(self.count(), 5)
+
+    def test_deleting_parent_removes_replies(self):
+        self.client.force_login(self.author)
+        response = self.client.post(f'/comment/{self.parent.pk}/delete/')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.count(), 1)
+        self.assertEqual(self.post.comments.get(), self.other)
+
+        Comment.objects.filter(pk=self.other.pk).delete()
+        self.assertEqual(self.count(), 0)
+
+    def test_save_keeps_concurrent_count(self):
+        # 内存中的文章对象是添加评论之前读取的
+        self.assertEqual(self.post.comment_count, 0)
+        self.post.title = '新标题'
+        self.post.save()
+        self.assertEqual(self.count(), 5)
+
+    def test_refresh_comment_counts(self):
+        Post.objects.filter(pk=self.post.pk).update(comment_count=42)
+        self.assertEqual(Post.refresh_comment_counts(), 1)
+        self.assertEqual(self.count(), 5)
+
+
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES, BLOG_DATABASE_REPLICAS=[])
+class TagCountTests(TestCase):
+    """标签的已发布文章数按保存前后的标签和发布状态增量调整，refresh_from_db之后以重新读取的值为准"""
+
+    def setUp(self):
+        self.author = User.objects.create_user('author', password='password')
+        self.post = Post.objects.create(
+            title='草稿', content='正文', tags='Python, Django', author=self.author, is_published=False
+        )
+
+    def counts(self):
+        return dict(Tag.objects.values_list('name', 'post_count'))
+
+    def publish_elsewhere(self):
+        # 另一个请求读取并发布了同一篇文章
+        other = Post.objects.get(pk=self.post.pk)
+        other.is_published = True
+        other.save()
+        self.assertEqual(self.counts(), {'Python': 1, 'Django': 1})
+
+    def test_publish_and_retag(self):
+        self.assertEqual(self.counts(), {'Python': 0, 'Django': 0})
+        self.post.is_published = True
+        self.post.save()
+        self.post.tags = 'Python, 数据库'
+        self.post.save()
+        self.assertEqual(self.counts(), {'Python': 1, 'Django': 0, '数据库': 1})
+        self.post.delete()
+        self.assertEqual(self.counts(), {'Python': 0, 'Django': 0, '数据库': 0})
+
+    def test_unpublish_after_refresh_from_db(self):
+        self.publish_elsewhere()
+        self.post.refresh_from_db()
+        self.assertTrue(self.post.is_published)
+        self.post.is_published = False
+        self.post.save()
+        self.assertEqual(self.counts(), {'Python': 0, 'Django': 0})
+
+    def test_unpublish_after_partial_refresh(self):
+        self.publish_elsewhere()
+        self.post.refresh_from_db(fields=['is_published'])
+        self.post.is_published = False
+        self.post.save()
+        self.assertEqual(self.counts(), {'Python': 0, 'Django': 0})
+
+    async def test_unpublish_after_arefresh_from_db(self):
+        await sync_to_async(self.publish_elsewhere)()
+        await self.post.arefresh_from_db()
+        self.post.is_published = False
+        await self.post.asave()
+        self.assertEqual(await sync_to_async(self.counts)(), {'Python': 0, 'Django': 0})
+
+
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES, BLOG_DATABASE_REPLICAS=[])
+class CommentThreadTests(TestCase):
+    """评论树按深度优先顺序逐条输出，层级再深也不会递归渲染模板"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', password='password')
+        cls.post = Post.objects.create(title='文章', content='正文', author=cls.author)
+
+    def reply(self, parent, content):
+        return Comment.objects.create(post=self.post, author=self.author, parent=parent, content=content)
+
+    def thread(self):
+        return Comment.build_thread(list(self.post.comments.order_by('path')))
+
+    def test_levels(self):
+        first = self.reply(None, '一')
+        child = self.reply(first, '一.一')
+        grandchild = self.reply(child, '一.一.一')
+        sibling = self.reply(first, '一.二')
+        second = self.reply(None, '二')
+
+        thread = self.thread()
+        self.assertEqual(thread, [first, child, grandchild, sibling, second])
+        self.assertEqual([comment.thread_depth for comment in thread], [0, 1, 2, 1, 0])
+        self.assertEqual([comment.has_replies for comment in thread], [True, True, False, False, False])
+        self.assertEqual([len(comment.closed_levels) for comment in thread], [0, 0, 1, 1, 0])
+
+    def test_deep_reply_chain(self):
+        parent = None
+        for index in range(300):
+            parent = self.reply(parent, f'第{index}层')
+
+        response = self.client.get(f'/post/{self.post.pk}/')
+        self.assertContains(response, '第299层')
+        content = response.content.decode()
+        self.assertEqual(content.count('<div'), content.count('</div>'))
+
+
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES, BLOG_DATABASE_REPLICAS=[])
+class CommentRenderTests(TestCase):
+    """评论保存时预渲染，详情页只批量渲染尚未渲染的旧评论并写回"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', password='password')
+        cls.post = Post.objects.create(title='文章', content='正文', author=cls.author)
+
+    def setUp(self):
+        caches['default'].clear()
+        self.render = self.enterContext(
+            mock.patch.object(models, 'render_markdown_batch', wraps=models.render_markdown_batch)
+        )
+
+    def comment(self, content):
+        return Comment.objects.create(post=self.post, author=self.author, content=content)
+
+    def test_prerendered_on_save(self):
+        comment = self.comment('**评论**')
+        self.assertEqual(Comment.objects.get(pk=comment.pk).content_html, '<p><strong>评论</strong></p>')
+        self.assertEqual(comment.render_hash, rendering.render_hash('**评论**'))
+
+        comment.save()
+        self.assertEqual(self.render.call_count, 1)
+        comment.content = '*修改*'
+        comment.save(update_fields=['content'])
+        self.assertEqual(Comment.objects.get(pk=comment.pk).content_html, '<p><em>修改</em></p>')
+        self.assertEqual(self.render.call_count, 2)
+
+    def test_detail_renders_only_unrendered_comments(self):
+        rendered = [self.comment(f'**已渲染{index}**') for index in range(3)]
+        legacy = [self.comment(f'**旧评论{index}**') for index in range(2)]
+        Comment.objects.filter(pk__in=[comment.pk for comment in legacy]).update(content_html='', render_hash='')
+        self.render.reset_mock()
+        url = f'/post/{self.post.pk}/'
+
+        # 文章、评论各一次查询，旧评论一次bulk_update写回
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.render.assert_called_once_with(['**旧评论0**', '**旧评论1**'])
+        for index in range(2):
+            self.assertContains(response, f'<strong>旧评论{index}</strong>', html=True)
+        self.assertTrue(all(Comment.objects.filter(pk__in=[comment.pk for comment in legacy]).values_list(
+            'render_hash', flat=True
+        )))
+
+        # 全部渲染后不再渲染，也不再写回
+        self.render.reset_mock()
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.render.assert_not_called()
+        for comment in [*rendered, *legacy]:
+            self.assertContains(response, comment.content.strip('*'))
+
+
+@override_settings(
+    CACHES={**TEST_CACHES, 'pages': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pages'}},
+    STORAGES=TEST_STORAGES,
+    BLOG_DATABASE_REPLICAS=[],
+)
+class PageCacheTests(TestCase):
+    """匿名访问的整页缓存：数据变化在事务提交后才使页面失效，已登录用户和有待显示消息的请求不使用缓存"""
+
+    def setUp(self):
+        caches['pages'].clear()
+        self.author = User.objects.create_user('author', password='password')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post = Post.objects.create(title='文章', content='正文', author=self.author)
+
+    def status(self, url='/'):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.get('X-Page-Cache')
+
+    def test_invalidated_on_commit(self):
+        self.assertEqual(self.status(), 'miss')
+        self.assertEqual(self.status(), 'hit')
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.post.title = '新标题'
+            self.post.save()
+        # 提交之前不失效：其他请求此时仍读到旧数据，提前失效会把旧页面缓存到新版本号下
+        self.assertEqual(self.status(), 'hit')
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.status(), 'miss')
+
+    def test_comment_invalidates_detail(self):
+        url = f'/post/{self.post.pk}/'
+        self.assertEqual(self.status(url), 'miss')
+        self.assertEqual(self.status(url), 'hit')
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(post=self.post, author=self.author, content='评论')
+        self.assertEqual(self.status(url), 'miss')
+
+    def test_logged_in_bypasses_cache(self):
+        self.assertEqual(self.status(), 'miss')
+        self.client.force_login(self.author)
+        self.assertIsNone(self.status())
+        self.assertIsNone(self.status())
+
+    def test_pending_messages_bypass_cache(self):
+        self.assertEqual(self.status(), 'miss')
+        self.client.force_login(self.author)
+        response = self.client.get('/logout/', follow=True)
+        # 登出后重定向到的列表页带有提示消息，不读取也不写入缓存
+        self.assertIsNone(response.get('X-Page-Cache'))
+        self.assertContains(response, '您已成功登出。')
+        self.assertEqual(self.status(), 'hit')
+
+
+@override_settings(
+    CACHES={**TEST_CACHES, 'pages': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pages'}},
+    STORAGES=TEST_STORAGES,
+    BLOG_DATABASE_REPLICAS=[],
+)
+class ConditionalPageTests(TestCase):
+    """条件请求：ETag/Last-Modified由分组版本号得到，未变化时返回304，所属分组失效后重新返回完整页面"""
+
+    def setUp(self):
+        caches['pages'].clear()
+        self.author = User.objects.create_user('author', password='password')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post = Post.objects.create(title='文章', content='正文', tags='Python', author=self.author)
+        self.urls = {'list': '/', 'detail': f'/post/{self.post.pk}/', 'tags': '/tags/'}
+
+    def validators(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        return response['ETag'], response['Last-Modified']
+
+    def revalidate(self, url, etag, last_modified):
+        """分别只带If-None-Match和只带If-Modified-Since重新请求，返回两次的状态码"""
+        return (
+            self.client.get(url, headers={'if-none-match': etag}).status_code,
+            self.client.get(url, headers={'if-modified-since': last_modified}).status_code,
+        )
+
+    def later(self):
+        # Last-Modified精确到秒，失效时把版本号的生成时间推后，避免与之前的时间落在同一秒内
+        return mock.patch.object(pagecache, 'time', mock.Mock(time=lambda: time.time() + 5))
+
+    def invalidate(self, *groups):
+        with self.later(), self.captureOnCommitCallbacks(execute=True):
+            pagecache.invalidate(*groups)
+
+    def test_not_modified(self):
+        for url in self.urls.values():
+            etag, last_modified = self.validators(url)
+            self.assertEqual(self.revalidate(url, etag, last_modified), (304, 304))
+            response = self.client.get(url, headers={'if-none-match': etag})
+            self.assertEqual(response.content, b'')
+            self.assertEqual(response['ETag'], etag)
+
+    def test_post_group_invalidated(self):
+        validators = {name: self.validators(url) for name, url in self.urls.items()}
+        self.invalidate(pagecache.post_group(self.post.pk))
+
+        self.assertEqual(self.revalidate(self.urls['detail'], *validators['detail']), (200, 200))
+        self.assertNotEqual(self.validators(self.urls['detail'])[0], validators['detail'][0])
+        for name in ('list', 'tags'):
+            self.assertEqual(self.revalidate(self.urls[name], *validators[name]), (304, 304))
+
+    def test_list_group_invalidated(self):
+        validators = {name: self.validators(url) for name, url in self.urls.items()}
+        self.invalidate(pagecache.LIST_GROUP)
+
+        for name in ('list', 'tags'):
+            self.assertEqual(self.revalidate(self.urls[name], *validators[name]), (200, 200))
+        self.assertEqual(self.revalidate(self.urls['detail'], *validators['detail']), (304, 304))
+
+    def test_saving_post_invalidates_detail_and_list(self):
+        validators = {name: self.validators(url) for name, url in self.urls.items()}
+        with self.later(), self.captureOnCommitCallbacks(execute=True):
+            self.post.title = '新标题'
+            self.post.save()
+        for name, url in self.urls.items():
+            self.assertEqual(self.revalidate(url, *validators[name]), (200, 200))
+
+    def test_logged_in_gets_full_page(self):
+        self.client.force_login(self.author)
+        response = self.client.get(self.urls['detail'])
+        self.assertFalse(response.has_header('ETag'))
+        self.assertFalse(response.has_header('Last-Modified'))
+
+
+@override_settings(
+    CACHES={**TEST_CACHES, 'template_fragments': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    STORAGES=TEST_STORAGES,
+    BLOG_DATABASE_REPLICAS=[],
+)
+class PostCardCacheTests(TestCase):
+    """列表页的文章卡片从片段缓存读取，文章更新（updated_at变化）或评论数变化后重新渲染"""
+
+    def setUp(self):
+        caches['template_fragments'].clear()
+        self.author = User.objects.create_user('author', password='password')
+        self.post = Post.objects.create(title='原标题', content='正文', tags='Python，Django, Python', author=self.author)
+
+    def test_tag_list(self):
+        self.assertEqual(self.post.tag_list, ['Python', 'Django'])
+        self.assertContains(self.client.get('/'), 'Django')
+
+    def test_card_versioned_by_updated_at(self):
+        self.assertContains(self.client.get('/'), '原标题')
+
+        # 不经过save()的修改不会更新updated_at，卡片仍使用缓存
+        Post.objects.filter(pk=self.post.pk).update(title='新标题')
+        self.assertContains(self.client.get('/'), '原标题')
+
+        self.post.refresh_from_db()
+        self.post.save()
+        self.assertContains(self.client.get('/'), '新标题')
+
+    def test_card_versioned_by_comment_count(self):
+        self.assertContains(self.client.get('/'), '0 条评论')
+        Comment.objects.create(post=self.post, author=self.author, content='评论')
+        self.assertContains(self.client.get('/'), '1 条评论')
+
+
+@override_settings(
+    CACHES={**TEST_CACHES, 'pages': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'feeds'}},
+    STORAGES=TEST_STORAGES,
+    BLOG_DATABASE_REPLICAS=[],
+)
+class FeedCacheTests(TestCase):
+    """订阅缓存只在文章变化时失效，内容未变化时条件请求返回304"""
+
+    def setUp(self):
+        caches['pages'].clear()
+        self.author = User.objects.create_user('author', password='password')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post = Post.objects.create(title='订阅', content='正文', tags='Python', author=self.author)
+
+    def test_not_modified_until_post_changes(self):
+        response = self.client.get('/feeds/')
+        self.assertContains(response, '订阅')
+        etag = response['ETag']
+
+        response = self.client.get('/feeds/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get('/feeds/atom/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+        # 评论不出现在订阅中，不会使订阅失效
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(post=self.post, author=self.author, content='评论')
+        self.assertEqual(self.client.get('/feeds/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.title = '新标题'
+            self.post.save()
+        response = self.client.get('/feeds/', HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, '新标题')
+
+    def test_tag_and_category_feeds(self):
+        self.assertContains(self.client.get('/feeds/tag/Python/'), '订阅')
+        self.assertEqual(self.client.get('/feeds/tag/Go/').status_code, 404)
+        self.assertEqual(self.client.get('/feeds/category/技术/').status_code, 404)
+
+
+@override_settings(
+    CACHES={**TEST_CACHES, 'pages': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'sitemap'}},
+    STORAGES=TEST_STORAGES,
+    BLOG_DATABASE_REPLICAS=[],
+    BLOG_SITEMAP_CHUNK_SIZE=1,
+)
+class SitemapTests(TestCase):
+    """站点地图按ID范围分段，每段只在段内文章变化时重新生成"""
+
+    def setUp(self):
+        caches['pages'].clear()
+        author = User.objects.create_user('author', password='password')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first = Post.objects.create(title='第一篇', content='正文', author=author)
+            self.second = Post.objects.create(title='第二篇', content='正文', author=author)
+
+    def fetch(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        if response.streaming:
+            return 'miss', b''.join(response.streaming_content).decode()
+        return response['X-Page-Cache'], response.content.decode()
+
+    def test_index_lists_chunks(self):
+        _, content = self.fetch('/sitemap.xml')
+        self.assertIn(f'/sitemap-posts-{self.first.pk}.xml', content)
+        self.assertIn(f'/sitemap-posts-{self.second.pk}.xml', content)
+        self.assertEqual(self.client.get('/sitemap-posts-0.xml').status_code, 404)
+
+    def test_chunk_rebuilt_only_when_its_posts_change(self):
+        url = f'/sitemap-posts-{self.first.pk}.xml'
+        status, content = self.fetch(url)
+        self.assertEqual(status, 'miss')
+        self.assertIn(f'/post/{self.first.pk}/', content)
+        self.assertNotIn(f'/post/{self.second.pk}/', content)
+        self.assertEqual(self.fetch(url), ('hit', content))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second.save()
+        self.assertEqual(self.fetch(url)[0], 'hit')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.save()
+        self.assertEqual(self.fetch(url)[0], 'miss')
+
+    async def test_chunk_streams_under_asgi(self):
+        url = f'/sitemap-posts-{self.first.pk}.xml'
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        # 异步迭代器：ASGI下逐块发送，不会先整段读入内存
+        self.assertTrue(response.is_async)
+        content = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertIn(f'/post/{self.first.pk}/', content)
+        self.assertTrue(content.endswith('</urlset>\n'))
+
+        # 输出完毕后写入缓存
+        response = await self.async_client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+
+
+@override_settings(CACHES=TEST_CACHES, BLOG_DATABASE_REPLICAS=[])
+class ImportTests(TestCase):
+    """导入在一个事务中分批写入：中途失败整体回滚，bulk_create之后标签的文章数正确"""
+
+    FILES = {
+        'one.md': '---\ntitle: 第一篇\ntags: Python, Django\n---\n正文',
+        'two.md': '---\ntitle: 第二篇\ntags: [Python]\n---\n正文',
+        'notes.txt': '不是Markdown',
+        'three.md': '没有frontmatter',
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', password='password')
+        Post.objects.create(title='已有文章', content='正文', tags='Python', author=cls.author)
+
+    def import_files(self, files=None, **kwargs):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'posts.zip')
+            with zipfile.ZipFile(path, 'w') as archive:
+                for name, content in (files or self.FILES).items():
+                    archive.writestr(name, content)
+            return import_zip(path, self.author, **{'batch_size': 1, 'workers': 1, **kwargs})
+
+    def tag_counts(self):
+        return dict(Tag.objects.values_list('name', 'post_count'))
+
+    def test_import_counts_tags(self):
+        report = self.import_files()
+        self.assertEqual([result.status for result in report.results], ['created', 'created', 'skipped', 'created'])
+        self.assertEqual(Post.objects.count(), 4)
+        self.assertEqual(Post.objects.get(pk=report.results[3].post_id).title, 'three')
+        self.assertEqual(self.tag_counts(), {'Python': 3, 'Django': 1})
+        self.assertEqual(Tag.objects.get(name='Django').posts.get().title, '第一篇')
+
+    def test_failure_rolls_back_every_batch(self):
+        def progress(report):
+            if len(report.created) == 2:
+                raise RuntimeError('中途失败')
+
+        with self.assertRaises(RuntimeError):
+            self.import_files(progress=progress)
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertEqual(self.tag_counts(), {'Python': 1})
+
+    def test_parallel_import_keeps_order(self):
+        files = {}
+        for index in range(60):
+            if index % 20 == 7:
+                files[f'{index:02}.txt'] = '不是Markdown'
+            elif index % 20 == 13:
+                files[f'{index:02}.md'] = f'---\ntitle: {"长" * 300}\n---\n正文'
+            else:
+                files[f'{index:02}.md'] = f'---\ntitle: 第{index}篇\ntags: Python, 标签{index % 3}\n---\n**正文{index}**'
+
+        with mock.patch.object(importers, 'ProcessPoolExecutor', wraps=importers.ProcessPoolExecutor) as pool:
+            report = self.import_files(files, batch_size=7, workers=3)
+        self.assertEqual(pool.call_args.kwargs['max_workers'], 3)
+
+        self.assertEqual([result.filename for result in report.results], list(files))
+        self.assertEqual(
+            [result.status for result in report.results],
+            ['skipped' if name.endswith('.txt') else 'failed' if name.startswith(('13', '33', '53')) else 'created'
+             for name in files],
+        )
+        self.assertTrue(all('超过' in result.message for result in report.failed))
+
+        created = [int(result.filename[:2]) for result in report.created]
+        self.assertEqual(len(created), 54)
+        posts = Post.objects.exclude(title='已有文章').order_by('pk')
+        self.assertEqual([post.pk for post in posts], [result.post_id for result in report.created])
+        self.assertEqual([post.title for post in posts], [f'第{index}篇' for index in created])
+        self.assertEqual(posts[0].content_html, f'<p><strong>正文{created[0]}</strong></p>')
+        self.assertEqual(self.tag_counts(), {
+            'Python': 55,
+            **{f'标签{group}': sum(1 for index in created if index % 3 == group) for group in range(3)},
+        })
+
+
+@override_settings(CACHES=TEST_CACHES, BLOG_DATABASE_REPLICAS=[])
+class ImportJobTests(TestCase):
+    """后台导入任务：等待处理 -> 处理中 -> 已完成/失败，进度接口只对管理员开放，超时任务定期放回队列"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='password', is_staff=True)
+
+    def setUp(self):
+        self.media_root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root))
+
+    def create_job(self, *files):
+        uploads = [SimpleUploadedFile(name, content.encode('utf-8')) for name, content in files]
+        return create_import_job('multiple', uploads, self.admin)
+
+    def test_job_lifecycle(self):
+        job = self.create_job(('one.md', '---\ntitle: 第一篇\ntags: Python\n---\n正文'), ('notes.txt', '跳过'))
+        self.assertEqual(job.status, ImportJob.STATUS_PENDING)
+        archive_path = job.archive.path
+        self.assertTrue(os.path.exists(archive_path))
+
+        claimed = claim_next_job()
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.status, ImportJob.STATUS_RUNNING)
+        self.assertIsNotNone(claimed.started_at)
+        self.assertIsNone(claim_next_job())
+
+        job = run_job(claimed)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.STATUS_DONE)
+        self.assertEqual(
+            (job.total_files, job.processed_files, job.created_count, job.skipped_count, job.failed_count),
+            (2, 2, 1, 1, 0),
+        )
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(Post.objects.get().title, '第一篇')
+        # 完成后删除上传的压缩包
+        self.assertFalse(os.path.exists(archive_path))
+
+    def test_failed_job_keeps_archive(self):
+        job = ImportJob.objects.create(created_by=self.admin, original_name='broken.zip')
+        job.archive.save('broken.zip', ContentFile(b'not a zip'))
+
+        with self.assertLogs('blog.jobs', 'ERROR'):
+            job = run_job(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.STATUS_FAILED)
+        self.assertEqual(job.created_count, 0)
+        self.assertEqual(job.errors[0]['filename'], 'broken.zip')
+        self.assertIn('已全部回滚', job.errors[0]['message'])
+        self.assertTrue(os.path.exists(job.archive.path))
+        self.assertFalse(Post.objects.exists())
+
+    def test_progress_requires_admin(self):
+        job = self.create_job(('one.md', '正文'))
+        url = f'/upload/jobs/{job.pk}/'
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        User.objects.create_user('reader', password='password')
+        self.client.login(username='reader', password='password')
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(self.admin)
+        progress = self.client.get(url).json()
+        self.assertEqual(progress['status'], ImportJob.STATUS_PENDING)
+        self.assertFalse(progress['finished'])
+
+        run_job(claim_next_job())
+        progress = self.client.get(url).json()
+        self.assertEqual((progress['status'], progress['total'], progress['created']), (ImportJob.STATUS_DONE, 1, 1))
+        self.assertTrue(progress['finished'])
+        self.assertEqual(self.client.get('/upload/jobs/0/').status_code, 404)
+
+    def test_requeue_stale_jobs(self):
+        stale = self.create_job(('one.md', '正文'))
+        recent = self.create_job(('two.md', '正文'))
+        ImportJob.objects.update(status=ImportJob.STATUS_RUNNING, started_at=timezone.now(), processed_files=1)
+        ImportJob.objects.filter(pk=stale.pk).update(updated_at=timezone.now() - STALE_AFTER - timedelta(minutes=1))
+
+        self.assertEqual(requeue_stale_jobs(), 1)
+        stale.refresh_from_db()
+        recent.refresh_from_db()
+        self.assertEqual((stale.status, stale.processed_files, stale.started_at), (ImportJob.STATUS_PENDING, 0, None))
+        self.assertEqual(recent.status, ImportJob.STATUS_RUNNING)
+
+    def test_worker_requeues_periodically(self):
+        # 模拟时钟：队列为空时每次等待20秒，worker应每隔REQUEUE_INTERVAL检查一次超时任务
+        clock = [0]
+
+        def sleep(seconds):
+            clock[0] += seconds
+            if clock[0] >= REQUEUE_INTERVAL * 2.5:
+                raise KeyboardInterrupt
+
+        with mock.patch.object(jobs, 'requeue_stale_jobs') as requeue, \
+                mock.patch.object(jobs, 'close_old_connections'), \
+                mock.patch.object(jobs.time, 'monotonic', lambda: clock[0]), \
+                mock.patch.object(jobs.time, 'sleep', sleep):
+            with self.assertRaises(KeyboardInterrupt):
+                run_worker(interval=20)
+        self.assertEqual(requeue.call_count, 3)
+
+
+@override_settings(BLOG_DATABASE_REPLICAS=[])
+class ImportJobClaimTests(TransactionTestCase):
+    """多个worker同时领取任务时，被其他事务锁定的任务直接跳过（SKIP LOCKED），不会等待或重复领取"""
+
+    def test_claim_skips_locked_jobs(self):
+        user = User.objects.create_user('admin', password='password', is_staff=True)
+        first = ImportJob.objects.create(created_by=user, archive='imports/first.zip')
+        second = ImportJob.objects.create(created_by=user, archive='imports/second.zip')
+        locked = threading.Event()
+        release = threading.Event()
+
+        def hold_lock():
+            # 另一个线程使用独立的数据库连接，模拟正在领取第一个任务的worker
+            try:
+                with transaction.atomic():
+                    ImportJob.objects.select_for_update().get(pk=first.pk)
+                    locked.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=hold_lock)
+        thread.start()
+        try:
+            self.assertTrue(locked.wait(10))
+            self.assertEqual(claim_next_job().pk, second.pk)
+            self.assertIsNone(claim_next_job())
+        finally:
+            release.set()
+            thread.join()
+
+        self.assertEqual(claim_next_job().pk, first.pk)
+        self.assertEqual(
+            dict(ImportJob.objects.values_list('pk', 'status')),
+            {first.pk: ImportJob.STATUS_RUNNING, second.pk: ImportJob.STATUS_RUNNING},
+        )
+
+
+@override_settings(CACHES=TEST_CACHES, BLOG_DATABASE_REPLICAS=[])
+class ExportTests(TestCase):
+    """导出的ZIP中每篇文章一个带frontmatter的Markdown文件，可以重新导入"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='password', is_staff=True)
+        cls.post = Post.objects.create(
+            title='第一篇: 导出', content='# 标题\n\n正文', author=cls.admin,
+            tags='Python, Django', category='教程', summary='摘要',
+        )
+        cls.draft = Post.objects.create(title='草稿', content='草稿正文', author=cls.admin, is_published=False)
+
+    def read_export(self, data):
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            self.assertIsNone(archive.testzip())
+            return {name: frontmatter.loads(archive.read(name).decode('utf-8')) for name in archive.namelist()}
+
+    def test_requires_admin(self):
+        response = self.client.get('/export/')
+        self.assertEqual(response.status_code, 302)
+
+        User.objects.create_user('reader', password='password')
+        self.client.login(username='reader', password='password')
+        self.assertEqual(self.client.get('/export/').status_code, 302)
+
+    def test_streams_posts_with_frontmatter(self):
+        self.client.force_login(self.admin)
+        response = self.client.get('/export/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertIn('attachment', response['Content-Disposition'])
+
+        files = self.read_export(b''.join(response.streaming_content))
+        self.assertEqual(sorted(files), [f'{self.post.pk}-第一篇_ 导出.md', f'{self.draft.pk}-草稿.md'])
+
+        exported = files[f'{self.post.pk}-第一篇_ 导出.md']
+        self.assertEqual(exported.content, self.post.content)
+        self.assertEqual(
+            exported.metadata,
+            {'title': '第一篇: 导出', 'tags': 'Python, Django', 'category': '教程', 'summary': '摘要'},
+        )
+        self.assertEqual(files[f'{self.draft.pk}-草稿.md'].metadata, {'title': '草稿', 'draft': True})
+
+    def test_command_published_only(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'export.zip')
+            call_command('export_posts', path, '--published-only', stdout=io.StringIO())
+            with open(path, 'rb') as output:
+                files = self.read_export(output.read())
+        self.assertEqual([item.metadata['title'] for item in files.values()], ['第一篇: 导出'])
+
+    def test_round_trip_keeps_drafts(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'export.zip')
+            call_command('export_posts', path, stdout=io.StringIO())
+            Post.objects.all().delete()
+            report = import_zip(path, self.admin, workers=1)
+
+        self.assertEqual(len(report.created), 2)
+        fields = ('title', 'content', 'tags', 'category', 'summary', 'is_published')
+        self.assertEqual(
+            list(Post.objects.order_by('pk').values_list(*fields)),
+            [
+                ('第一篇: 导出', '# 标题\n\n正文', 'Python, Django', '教程', '摘要', True),
+                ('草稿', '草稿正文', '', '', '', False),
+            ],
+        )
+        self.assertEqual(dict(Tag.objects.values_list('name', 'post_count')), {'Python': 1, 'Django': 1})
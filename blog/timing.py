@@ -0,0 +1,170 @@
+"""
+请求耗时统计
+ServerTimingMiddleware统计每个请求的数据库查询次数和耗时、Markdown渲染耗时、模板渲染耗时以及总耗时，
+通过Server-Timing响应头输出（浏览器开发者工具的Network面板可以直接查看），也可以按需写入结构化日志
+
+统计数据保存在ContextVar中，请求之外或关闭统计时各处的计时只是一次ContextVar读取，开销可以忽略
+由 BLOG_SERVER_TIMING / BLOG_SERVER_TIMING_LOG 设置开关
+中间件同时支持WSGI和ASGI，ASGI下不会让异步视图退回到同步适配器中执行
+"""
+import json
+import logging
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends import django as django_backend
+
+
+logger = logging.getLogger(__name__)
+
+_current_timer = ContextVar('blog_request_timer', default=None)
+
+
+class RequestTimer:
+    """一个请求中各部分的累计耗时（秒）和查询次数"""
+
+    def __init__(self):
+        self.durations = defaultdict(float)
+        self.queries = 0
+
+    def add(self, name, duration):
+        self.durations[name] += duration
+
+
+@contextmanager
+def track(name):
+    """统计代码块的耗时，计入当前请求的name项；不在请求中时不做任何统计"""
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - start)
+
+
+def query_timer(timer):
+    """数据库执行包装器：统计查询次数和耗时"""
+    def wrapper(execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            timer.queries += 1
+            timer.add('db', time.perf_counter() - start)
+    return wrapper
+
+
+class ServerTimingMiddleware:
+    """为响应添加Server-Timing头，应放在MIDDLEWARE的第一项，总耗时才能包含其他中间件"""
+
+    # Server-Timing中各项的名称和说明（响应头只能使用ASCII字符）
+    METRICS = (
+        ('db', 'Database'),
+        ('markdown', 'Markdown'),
+        ('template', 'Templates'),
+    )
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'BLOG_SERVER_TIMING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.log = getattr(settings, 'BLOG_SERVER_TIMING_LOG', False)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        timer = RequestTimer()
+        token = _current_timer.set(timer)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                self.wrap_connections(stack, timer)
+                response = self.get_response(request)
+        finally:
+            _current_timer.reset(token)
+        return self.finish(request, response, timer, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        timer = RequestTimer()
+        token = _current_timer.set(timer)
+        start = time.perf_counter()
+        stack = ExitStack()
+        try:
+            # 数据库连接只能在创建它的线程中使用，异步ORM的查询都在sync_to_async的线程中执行，
+            # 包装器也要在该线程中安装
+            await sync_to_async(self.wrap_connections)(stack, timer)
+            response = await self.get_response(request)
+        finally:
+            stack.close()
+            _current_timer.reset(token)
+        return self.finish(request, response, timer, time.perf_counter() - start)
+
+    def wrap_connections(self, stack, timer):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(query_timer(timer)))
+
+    def finish(self, request, response, timer, total):
+        response['Server-Timing'] = self.format_header(timer, total)
+        if self.log:
+            self.write_log(request, response, timer, total)
+        return response
+
+    def format_header(self, timer, total):
+        entries = []
+        for name, description in self.METRICS:
+            if name == 'db':
+                description = f'{description} ({timer.queries} queries)'
+            entries.append(f'{name};dur={timer.durations[name] * 1000:.1f};desc="{description}"')
+        entries.append(f'total;dur={total * 1000:.1f};desc="Total"')
+        return ', '.join(entries)
+
+    def write_log(self, request, response, timer, total):
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'db_ms': round(timer.durations['db'] * 1000, 2),
+            'queries': timer.queries,
+            'markdown_ms': round(timer.durations['markdown'] * 1000, 2),
+            'template_ms': round(timer.durations['template'] * 1000, 2),
+        }))
+
+
+class Template(django_backend.Template):
+    """统计模板渲染耗时的模板包装"""
+
+    def render(self, context=None, request=None):
+        with track('template'):
+            return super().render(context, request)
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """
+    在Django模板引擎基础上统计模板渲染耗时，在TEMPLATES的BACKEND中使用
+    include等嵌套模板在同一次render中完成，不会重复计时
+    """
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except django_backend.TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
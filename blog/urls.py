@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import feeds, sitemaps, views
 
 urlpatterns = [
     # 认证相关
@@ -13,8 +13,23 @@ urlpatterns = [
     path('search/', views.search_posts, name='search_posts'),
     path('tags/', views.tag_cloud, name='tag_cloud'),
 
+    # 订阅
+    path('feeds/', feeds.post_feed, name='post_feed'),
+    path('feeds/tag/<path:name>/', feeds.tag_feed, name='tag_feed'),
+    path('feeds/category/<path:name>/', feeds.category_feed, name='category_feed'),
+    path('feeds/atom/', feeds.atom_post_feed, name='atom_post_feed'),
+    path('feeds/atom/tag/<path:name>/', feeds.atom_tag_feed, name='atom_tag_feed'),
+    path('feeds/atom/category/<path:name>/', feeds.atom_category_feed, name='atom_category_feed'),
+
+    # 站点地图
+    path('sitemap.xml', sitemaps.sitemap_index, name='sitemap_index'),
+    path('sitemap-posts-<int:chunk>.xml', sitemaps.sitemap_chunk, name='sitemap_chunk'),
+
     # 管理员功能
     path('upload/', views.upload_markdown, name='upload_markdown'),
+    path('upload/jobs/<int:pk>/', views.import_job_progress, name='import_job_progress'),
+    path('export/', views.export_posts, name='export_posts'),
+    path('stats/db-pool/', views.db_pool_stats, name='db_pool_stats'),
     path('create/', views.create_post, name='create_post'),
     path('post/<int:pk>/edit/', views.edit_post, name='edit_post'),
     path('post/<int:pk>/delete/', views.delete_post, name='delete_post'),
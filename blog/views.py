@@ -1,19 +1,23 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib import messages
-from django.core.paginator import Paginator
 from django.http import JsonResponse
-from django.db.models import Q
-from .models import Post, Comment
+from django.urls import reverse
+from django.db.models import Count, Window
+from django.utils import timezone
+from .models import Post, Comment, Tag, ImportJob
 from .forms import MarkdownUploadForm, PostForm, CommentForm
-import os
-import zipfile
-import frontmatter
-import markdown
-import tempfile
-import re
+from .dbpool import pool_stats
+from .exporters import iter_zip
+from .jobs import create_import_job
+from .pagecache import LIST_GROUP, cache_anonymous_page, conditional_page, post_group
+from .pagination import KeysetPaginator
+from .routers import read_from_replica
+from .search import apply_search
+from .streaming import streaming_response
 
 
 # 用户认证视图
@@ -56,130 +60,145 @@ def logout_view(request):
 
 
 # 博客列表和详情视图
-def post_list(request):
+# 以下只读页面是异步视图：在ASGI下查询使用异步ORM，Markdown渲染放到线程池中执行，
+# 等待数据库和慢速客户端时不占用工作线程；在WSGI下由Django自动在同步适配器中运行
+# 配置了只读副本时，这些页面的GET请求从副本读取（见routers.py）
+async def render_async(request, template_name, context):
+    """
+    在同步线程中渲染模板
+    模板可能访问request.user、会话、消息等需要查询数据库的对象，这些访问不能在事件循环中进行
+    """
+    return await sync_to_async(render)(request, template_name, context)
+
+
+@read_from_replica
+@conditional_page(LIST_GROUP)
+@cache_anonymous_page(LIST_GROUP)
+async def post_list(request):
     """博客列表页面（分页）"""
-    posts = Post.objects.filter(is_published=True)
-    paginator = Paginator(posts, 10)  # 每页显示10篇文章
+    posts = Post.objects.filter(is_published=True).for_listing()
+    paginator = KeysetPaginator(posts, 10)  # 每页显示10篇文章，按 (created_at, id) 游标翻页
 
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = await paginator.aget_page(request.GET.get('cursor'))
 
-    return render(request, 'blog/post_list.html', {'page_obj': page_obj})
+    return await render_async(request, 'blog/post_list.html', {'page_obj': page_obj})
 
 
-def post_detail(request, pk):
+@read_from_replica
+@conditional_page(post_group)
+@cache_anonymous_page(post_group)
+async def post_detail(request, pk):
     """博客详情页面"""
-    post = get_object_or_404(Post, pk=pk, is_published=True)
+    post = await aget_object_or_404(Post.objects.select_related('author'), pk=pk, is_published=True)
 
-    # 将markdown转换为HTML
-    md = markdown.Markdown(extensions=['extra', 'codehilite', 'toc'])
-    post.html_content = md.convert(post.content)
+    # HTML在保存时已预渲染；旧数据尚未渲染时在线程池中补做一次并写回（不更新updated_at）
+    if not post.render_hash:
+        await sync_to_async(post.render_content, thread_sensitive=False)()
+        await Post.objects.filter(pk=post.pk).aupdate(
+            content_html=post.content_html,
+            toc_html=post.toc_html,
+            render_hash=post.render_hash
+        )
 
-    # 获取评论（只获取顶级评论，回复通过parent关系获取）
-    comments = post.comments.filter(parent=None).select_related('author').prefetch_related('replies__author')
+    # 一次查询取出全部评论（按物化路径排序），按层级的变化输出任意层级的评论树
+    all_comments = [comment async for comment in post.comments.select_related('author').order_by('path')]
+    comments = Comment.build_thread(all_comments)
 
     # 处理评论提交
-    if request.method == 'POST' and request.user.is_authenticated:
+    user = await request.auser()
+    if request.method == 'POST' and user.is_authenticated:
         form = CommentForm(request.POST)
         if form.is_valid():
             comment = form.save(commit=False)
             comment.post = post
-            comment.author = request.user
+            comment.author = user
 
-            # 处理回复（如果有parent_id）
+            # 处理回复（如果有parent_id），父评论必须属于同一篇文章
             parent_id = request.POST.get('parent_id')
             if parent_id:
-                parent_comment = get_object_or_404(Comment, pk=parent_id)
+                parent_comment = await aget_object_or_404(Comment, pk=parent_id, post=post)
                 comment.parent = parent_comment
 
-            comment.save()
+            await comment.asave()
             messages.success(request, '评论发表成功！')
             return redirect('post_detail', pk=pk)
     else:
         form = CommentForm()
 
-    # 转换评论内容为HTML（支持Markdown）
-    for comment in comments:
-        comment.html_content = md.convert(comment.content)
-        for reply in comment.replies.all():
-            reply.html_content = md.convert(reply.content)
+    # 评论HTML在保存时已预渲染；旧数据尚未渲染的评论在此批量补做并写回
+    await Comment.arender_many([comment for comment in all_comments if not comment.render_hash])
 
-    return render(request, 'blog/post_detail.html', {
+    return await render_async(request, 'blog/post_detail.html', {
         'post': post,
         'comments': comments,
         'comment_form': form,
-        'comment_count': post.comments.count()
+        'comment_count': len(all_comments)
     })
 
 
-def search_posts(request):
-    """搜索博客文章"""
+@read_from_replica
+@cache_anonymous_page(LIST_GROUP)
+async def search_posts(request):
+    """搜索博客文章（全文检索，按相关度排序）"""
     query = request.GET.get('q', '').strip()
 
     if query:
-        # 使用Q对象进行OR查询，搜索标题、内容、摘要、标签和分类
-        posts = Post.objects.filter(
-            Q(title__icontains=query) |
-            Q(content__icontains=query) |
-            Q(summary__icontains=query) |
-            Q(tags__icontains=query) |
-            Q(category__icontains=query),
-            is_published=True
-        ).distinct()
+        # 结果总数通过窗口函数在同一条查询中得到，之后随游标传递，翻页时不再重复统计
+        posts = apply_search(
+            Post.objects.filter(is_published=True).for_listing(), query
+        ).annotate(total_results=Window(Count('pk')))
     else:
         posts = Post.objects.none()
 
-    # 分页
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # 分页（按相关度游标翻页）
+    paginator = KeysetPaginator(posts, 10, ordering=('-rank', '-created_at', '-pk'))
+    page_obj = await paginator.aget_page(request.GET.get('cursor')) if query else None
 
-    return render(request, 'blog/search_results.html', {
+    total_results = 0
+    if page_obj is not None:
+        if 'total' not in page_obj.extra:
+            page_obj.extra['total'] = page_obj[0].total_results if page_obj else 0
+        total_results = page_obj.extra['total']
+
+    return await render_async(request, 'blog/search_results.html', {
         'page_obj': page_obj,
         'query': query,
-        'total_results': posts.count()
+        'total_results': total_results
     })
 
 
-def tag_cloud(request):
+@read_from_replica
+@conditional_page(LIST_GROUP)
+@cache_anonymous_page(LIST_GROUP)
+async def tag_cloud(request):
     """标签云页面 - 显示所有标签和按标签筛选的文章"""
-    # 获取所有已发布文章的标签
-    all_posts = Post.objects.filter(is_published=True).exclude(tags='')
-
-    # 统计所有标签及其出现次数
-    tag_counts = {}
-    for post in all_posts:
-        # 分割标签（支持逗号和中文逗号）
-        tags = [tag.strip() for tag in post.tags.replace('，', ',').split(',') if tag.strip()]
-        for tag in tags:
-            tag_counts[tag] = tag_counts.get(tag, 0) + 1
-
-    # 按文章数量降序排序
-    sorted_tags = sorted(tag_counts.items(), key=lambda x: x[1], reverse=True)
+    # 标签及其已发布文章数由Tag模型维护，按文章数量降序排序
+    sorted_tags = [tag async for tag in Tag.objects.filter(post_count__gt=0).values_list('name', 'post_count')]
 
     # 获取选中的标签
     selected_tag = request.GET.get('tag', '').strip()
 
-    # 如果选择了标签，筛选文章
+    # 如果选择了标签，通过标签关联筛选文章
+    page_obj = None
+    total_posts = 0
     if selected_tag:
-        posts = Post.objects.filter(
-            tags__icontains=selected_tag,
-            is_published=True
-        ).order_by('-created_at')
+        tag = await Tag.objects.filter(name=selected_tag).afirst()
+        if tag is not None:
+            posts = tag.posts.filter(is_published=True).for_listing()
+            total_posts = tag.post_count
+        else:
+            posts = Post.objects.none()
 
         # 分页
-        paginator = Paginator(posts, 10)
-        page_number = request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
-    else:
-        page_obj = None
-        posts = None
+        paginator = KeysetPaginator(posts, 10)
+        page_obj = await paginator.aget_page(request.GET.get('cursor'))
+        page_obj.extra['total'] = total_posts
 
-    return render(request, 'blog/tag_cloud.html', {
+    return await render_async(request, 'blog/tag_cloud.html', {
         'sorted_tags': sorted_tags,
         'selected_tag': selected_tag,
         'page_obj': page_obj,
-        'total_posts': posts.count() if posts else 0
+        'total_posts': total_posts
     })
 
 
@@ -192,7 +211,7 @@ def is_admin(user):
 @login_required
 @user_passes_test(is_admin)
 def upload_markdown(request):
-    """管理员上传markdown文件"""
+    """管理员上传markdown文件（保存后交给后台worker导入）"""
     if request.method == 'POST':
         form = MarkdownUploadForm(request.POST, request.FILES)
         if form.is_valid():
@@ -200,28 +219,57 @@ def upload_markdown(request):
 
             if upload_type == 'single':
                 # 单个文件上传
-                md_file = request.FILES.get('single_file')
-                process_markdown_file(md_file, request.user)
-                messages.success(request, '文件上传成功！')
-
+                files = [request.FILES.get('single_file')]
             elif upload_type == 'multiple':
                 # 多个文件上传
                 files = request.FILES.getlist('multiple_files')
-                for md_file in files:
-                    process_markdown_file(md_file, request.user)
-                messages.success(request, f'成功上传 {len(files)} 个文件！')
-
             elif upload_type == 'zip':
                 # ZIP压缩包上传
-                zip_file = request.FILES.get('zip_file')
-                count = process_zip_file(zip_file, request.user)
-                messages.success(request, f'成功从压缩包中导入 {count} 个文件！')
+                files = [request.FILES.get('zip_file')]
+            else:
+                files = []
+
+            job = create_import_job(upload_type, files, request.user)
+            if job is None:
+                messages.error(request, '请选择要上传的文件！')
+                return redirect('upload_markdown')
 
-            return redirect('upload_markdown')
+            messages.success(request, '文件上传成功，正在后台导入...')
+            return redirect(f"{reverse('upload_markdown')}?job={job.pk}")
     else:
         form = MarkdownUploadForm()
 
-    return render(request, 'blog/upload_markdown.html', {'form': form})
+    # 上传后在页面上轮询导入进度
+    job = None
+    job_id = request.GET.get('job', '')
+    if job_id.isdigit():
+        job = ImportJob.objects.filter(pk=job_id).first()
+
+    return render(request, 'blog/upload_markdown.html', {'form': form, 'job': job})
+
+
+@login_required
+@user_passes_test(is_admin)
+def import_job_progress(request, pk):
+    """导入任务进度（JSON）"""
+    job = get_object_or_404(ImportJob, pk=pk)
+    return JsonResponse(job.progress())
+
+
+@login_required
+@user_passes_test(is_admin)
+def export_posts(request):
+    """管理员导出全部文章（带frontmatter的Markdown文件打包为ZIP），边生成边下载，内存占用与文章数量无关"""
+    response = streaming_response(request, iter_zip(), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="blog-export-{timezone.localdate():%Y%m%d}.zip"'
+    return response
+
+
+@login_required
+@user_passes_test(is_admin)
+def db_pool_stats(request):
+    """当前进程的数据库连接池统计（JSON），?reset=1 读取后清零累计计数"""
+    return JsonResponse(pool_stats(reset=request.GET.get('reset') == '1'))
 
 
 @login_required
@@ -300,167 +348,3 @@ def delete_comment(request, pk):
         return redirect('post_detail', pk=post_pk)
 
     return redirect('post_detail', pk=post_pk)
-
-
-def clean_notion_filename(filename):
-    """
-    清理Notion导出的文件名，去掉UUID哈希
-    例如: "2025 211130a0ce0b80e8a540fd3052af5f90.md" -> "2025.md"
-    """
-    # 去掉文件扩展名
-    name_without_ext = os.path.splitext(filename)[0]
-
-    # Notion UUID 格式: 32个十六进制字符
-    # 匹配模式: 文件名后面跟着空格和32位十六进制字符
-    pattern = r'\s+[0-9a-f]{32}$'
-    cleaned_name = re.sub(pattern, '', name_without_ext, flags=re.IGNORECASE)
-
-    # 如果没有匹配到Notion格式，返回原始文件名（不含扩展名）
-    return cleaned_name if cleaned_name else name_without_ext
-
-
-def process_markdown_file(md_file, author):
-    """处理单个markdown文件"""
-    # 读取文件内容
-    raw_content = md_file.read()
-
-    # 尝试多种编码解码
-    encodings = ['utf-8', 'gbk', 'gb2312', 'utf-8-sig', 'latin1']
-    content = None
-
-    for encoding in encodings:
-        try:
-            content = raw_content.decode(encoding)
-            break
-        except (UnicodeDecodeError, AttributeError):
-            continue
-
-    # 如果所有编码都失败，使用errors='ignore'
-    if content is None:
-        content = raw_content.decode('utf-8', errors='ignore')
-
-    # 移除NUL字符(0x00)，PostgreSQL不允许这些字符
-    content = content.replace('\x00', '')
-
-    # 清理文件名（去掉Notion UUID）
-    cleaned_filename = clean_notion_filename(md_file.name)
-
-    # 尝试解析frontmatter
-    try:
-        post_data = frontmatter.loads(content)
-        title = post_data.get('title', cleaned_filename)
-        tags = post_data.get('tags', '')
-        category = post_data.get('category', '')
-        summary = post_data.get('summary', '')
-        content_body = post_data.content
-    except:
-        # 如果没有frontmatter，使用清理后的文件名作为标题
-        title = cleaned_filename
-        tags = ''
-        category = ''
-        summary = ''
-        content_body = content
-
-    # 如果tags是列表，转换为逗号分隔的字符串
-    if isinstance(tags, list):
-        tags = ', '.join(tags)
-
-    # 清理所有字段，移除NUL字符
-    title = str(title).replace('\x00', '')
-    tags = str(tags).replace('\x00', '')
-    category = str(category).replace('\x00', '')
-    summary = str(summary).replace('\x00', '')
-    content_body = str(content_body).replace('\x00', '')
-
-    # 创建博客文章
-    Post.objects.create(
-        title=title,
-        content=content_body,
-        summary=summary,
-        author=author,
-        tags=tags,
-        category=category
-    )
-
-
-def process_zip_file(zip_file, author):
-    """处理ZIP压缩包中的所有markdown文件"""
-    count = 0
-
-    # 创建临时文件
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as temp_file:
-        for chunk in zip_file.chunks():
-            temp_file.write(chunk)
-        temp_path = temp_file.name
-
-    # 解压并处理
-    with zipfile.ZipFile(temp_path, 'r') as zip_ref:
-        for file_name in zip_ref.namelist():
-            if file_name.endswith('.md') or file_name.endswith('.markdown'):
-                with zip_ref.open(file_name) as md_file:
-                    # 读取文件内容
-                    raw_content = md_file.read()
-
-                    # 尝试多种编码解码
-                    encodings = ['utf-8', 'gbk', 'gb2312', 'utf-8-sig', 'latin1']
-                    content = None
-
-                    for encoding in encodings:
-                        try:
-                            content = raw_content.decode(encoding)
-                            break
-                        except (UnicodeDecodeError, AttributeError):
-                            continue
-
-                    # 如果所有编码都失败，使用errors='ignore'
-                    if content is None:
-                        content = raw_content.decode('utf-8', errors='ignore')
-
-                    # 移除NUL字符(0x00)，PostgreSQL不允许这些字符
-                    content = content.replace('\x00', '')
-
-                    # 清理文件名（去掉Notion UUID）
-                    cleaned_filename = clean_notion_filename(os.path.basename(file_name))
-
-                    # 解析frontmatter
-                    try:
-                        post_data = frontmatter.loads(content)
-                        title = post_data.get('title', cleaned_filename)
-                        tags = post_data.get('tags', '')
-                        category = post_data.get('category', '')
-                        summary = post_data.get('summary', '')
-                        content_body = post_data.content
-                    except:
-                        # 如果没有frontmatter，使用清理后的文件名作为标题
-                        title = cleaned_filename
-                        tags = ''
-                        category = ''
-                        summary = ''
-                        content_body = content
-
-                    # 如果tags是列表，转换为逗号分隔的字符串
-                    if isinstance(tags, list):
-                        tags = ', '.join(tags)
-
-                    # 清理所有字段，移除NUL字符
-                    title = str(title).replace('\x00', '')
-                    tags = str(tags).replace('\x00', '')
-                    category = str(category).replace('\x00', '')
-                    summary = str(summary).replace('\x00', '')
-                    content_body = str(content_body).replace('\x00', '')
-
-                    # 创建文章
-                    Post.objects.create(
-                        title=title,
-                        content=content_body,
-                        summary=summary,
-                        author=author,
-                        tags=tags,
-                        category=category
-                    )
-                    count += 1
-
-    # 删除临时文件
-    os.remove(temp_path)
-
-    return count
@@ -27,17 +27,16 @@ print(f"Host: {db_host}:{db_port}")
 # Connect to postgres database (default)
 print("\n1. Connecting to PostgreSQL...")
 try:
-    import psycopg2
-    from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+    import psycopg
 
-    conn = psycopg2.connect(
+    conn = psycopg.connect(
         dbname='postgres',  # Connect to default database
         user=db_user,
         password=db_password,
         host=db_host,
-        port=db_port
+        port=db_port,
+        autocommit=True  # CREATE DATABASE cannot run inside a transaction
     )
-    conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
     print("   [OK] Connected to PostgreSQL")
 
 except Exception as e:
@@ -78,7 +77,7 @@ conn.close()
 # Verify the database
 print(f"\n4. Verifying database '{db_name}'...")
 try:
-    conn = psycopg2.connect(
+    conn = psycopg.connect(
         dbname=db_name,
         user=db_user,
         password=db_password,
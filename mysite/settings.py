@@ -41,12 +41,19 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
+    # runserver也由WhiteNoise提供静态文件，与生产环境的响应头一致
+    'whitenoise.runserver_nostatic',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'blog',
 ]
 
 MIDDLEWARE = [
+    'blog.timing.ServerTimingMiddleware',
+    'blog.routers.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # WhiteNoise的静态文件服务，同时支持同步和异步调用，ASGI下不会让中间件链退回同步执行（见blog/staticfiles.py）
+    'blog.staticfiles.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -59,7 +66,8 @@ ROOT_URLCONF = 'mysite.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Django模板引擎，额外统计模板渲染耗时（用于Server-Timing）
+        'BACKEND': 'blog.timing.DjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -78,6 +86,25 @@ WSGI_APPLICATION = 'mysite.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+def env_bool(name, default):
+    value = os.getenv(name)
+    if value is None or value == '':
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def env_number(name, default, cast=int):
+    value = os.getenv(name)
+    return cast(value) if value else default
+
+
+# 数据库连接
+# DB_POOL开启时（默认）使用psycopg 3连接池：每个进程保持DB_POOL_MIN_SIZE到DB_POOL_MAX_SIZE个连接，
+# 请求直接从池中取用已建立的连接，结束后归还，不再为每个请求重新连接和认证
+# 关闭连接池时，每个连接在请求之间最多保留DB_CONN_MAX_AGE秒（0为每个请求重新连接，None为一直保留）
+# DB_CONN_HEALTH_CHECKS开启时，复用连接前先检查连接是否可用（数据库重启等情况下自动重连）
+DB_POOL = env_bool('DB_POOL', True)
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -86,12 +113,48 @@ DATABASES = {
         'PASSWORD': os.getenv('DB_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', 'localhost'),
         'PORT': os.getenv('DB_PORT', '5432'),
+        # 连接池自行管理连接的生命周期，不能与持久连接同时使用
+        'CONN_MAX_AGE': 0 if DB_POOL else env_number('DB_CONN_MAX_AGE', 0),
+        'CONN_HEALTH_CHECKS': env_bool('DB_CONN_HEALTH_CHECKS', True),
         'OPTIONS': {
             'client_encoding': 'UTF8',
         },
     }
 }
 
+if DB_POOL:
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': env_number('DB_POOL_MIN_SIZE', 2),
+        'max_size': env_number('DB_POOL_MAX_SIZE', 10),
+        # 连接全部被占用时，请求最多等待的秒数
+        'timeout': env_number('DB_POOL_TIMEOUT', 10, float),
+        # 空闲超过该秒数的连接被关闭（不少于min_size个）
+        'max_idle': env_number('DB_POOL_MAX_IDLE', 300, float),
+        # 连接最长使用时间（秒），到期后替换为新连接
+        'max_lifetime': env_number('DB_POOL_MAX_LIFETIME', 1800, float),
+    }
+
+# 只读副本：DB_REPLICA_HOSTS为逗号分隔的 host[:port] 列表，依次生成数据库别名 replica1、replica2……
+# 其余连接参数与default相同；DB_REPLICA_NAME可以指定不同的库名，便于本地用另一个库模拟副本
+# 文章列表、详情、搜索和标签页的GET请求从副本读取，其余读写使用主库（见blog/routers.py）
+# 写入过数据库的浏览器在BLOG_REPLICA_STICKY_SECONDS秒内始终从主库读取，应大于副本的复制延迟
+BLOG_DATABASE_REPLICAS = []
+for index, address in enumerate(filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), 1):
+    host, _, port = address.strip().partition(':')
+    alias = f'replica{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME') or DATABASES['default']['NAME'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        # 测试时副本使用主库的测试数据库
+        'TEST': {'MIRROR': 'default'},
+    }
+    BLOG_DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['blog.routers.PrimaryReplicaRouter']
+BLOG_REPLICA_STICKY_SECONDS = env_number('DB_REPLICA_STICKY_SECONDS', 10)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -131,6 +194,18 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# collectstatic时为文件名加上内容哈希（写入manifest），并预先生成gzip和brotli压缩版本；
+# 由WhiteNoise（blog.staticfiles.StaticFilesMiddleware）直接从STATIC_ROOT提供，带哈希的文件返回一年以上的Cache-Control: immutable，
+# 浏览器支持时返回压缩版本。DEBUG下直接从各应用和STATICFILES_DIRS读取，不需要先执行collectstatic
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
 # Media files
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -140,6 +215,76 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Markdown渲染配置
+# 修改后需运行 python manage.py rerender_posts 重新生成已保存的HTML
+MARKDOWN_EXTENSIONS = ['extra', 'codehilite', 'toc']
+MARKDOWN_EXTENSION_CONFIGS = {}
+
+# Markdown导入：每批bulk_create写入的文章数量
+BLOG_IMPORT_BATCH_SIZE = 500
+# Markdown导入：解析和渲染使用的进程数，None为CPU核数，1为在当前进程中解析
+BLOG_IMPORT_WORKERS = None
+# 按上面的设置确定进程数时，每个进程至少分到的文件数；文件较少的导入不启动子进程
+BLOG_IMPORT_MIN_FILES_PER_WORKER = 50
+
+# 缓存：default为进程内缓存（Markdown渲染结果等）
+# pages为匿名访问的整页缓存，使用文件缓存以便多个Web进程共享页面和失效版本号
+# highlight为代码块高亮结果，Web进程、导入和重新渲染命令共享，见下方HIGHLIGHT_CACHE_REDIS_URL
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'pages': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'pages',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    # 未配置Redis时的后备：文件缓存超过MAX_ENTRIES后随机删除一部分条目（不是LRU），
+    # 并且每次写入都要列出缓存目录，条目数需要保持较少
+    'highlight': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'highlight',
+        'OPTIONS': {'MAX_ENTRIES': 3000},
+    },
+    # {% cache %}模板片段缓存（列表页的文章卡片），片段键包含文章的更新时间，内容变化后自动换用新键
+    'template_fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'template-fragments',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+# 代码块高亮的共享缓存使用Redis（需要安装redis：pip install "django-blog[redis]"），
+# Redis需要设置 maxmemory 和 maxmemory-policy allkeys-lru，内存用满时淘汰最久未使用的代码块
+HIGHLIGHT_CACHE_REDIS_URL = os.getenv('HIGHLIGHT_CACHE_REDIS_URL', '')
+if HIGHLIGHT_CACHE_REDIS_URL:
+    CACHES['highlight'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': HIGHLIGHT_CACHE_REDIS_URL,
+        'KEY_PREFIX': 'blog',
+    }
+
+# 代码块高亮缓存：共享缓存的别名（None为只使用进程内缓存）和每个进程内LRU缓存的条数
+BLOG_HIGHLIGHT_CACHE_ALIAS = 'highlight'
+BLOG_HIGHLIGHT_CACHE_SIZE = 2000
+
+# 匿名访问整页缓存：使用的缓存和页面过期时间（秒）
+BLOG_PAGE_CACHE_ALIAS = 'pages'
+BLOG_PAGE_CACHE_TIMEOUT = 600
+
+# RSS/Atom订阅：每个订阅的条目数，以及订阅缓存的过期时间（秒，文章变化时会立即失效）
+BLOG_FEED_ITEMS = 20
+BLOG_FEED_CACHE_TIMEOUT = 60 * 60 * 24
+
+# 站点地图：每段包含的文章ID范围大小（协议规定每个文件最多50000个URL），以及缓存的过期时间（秒）
+BLOG_SITEMAP_CHUNK_SIZE = 10000
+BLOG_SITEMAP_CACHE_TIMEOUT = 60 * 60 * 24
+
+# 请求耗时统计：响应头Server-Timing输出数据库、Markdown、模板渲染和总耗时
+# BLOG_SERVER_TIMING_LOG为True时每个请求额外写一行JSON日志（logger: blog.timing）
+BLOG_SERVER_TIMING = True
+BLOG_SERVER_TIMING_LOG = False
+
 # Login/Logout redirect
 LOGIN_REDIRECT_URL = 'post_list'
 LOGOUT_REDIRECT_URL = 'post_list'
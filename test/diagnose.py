@@ -66,14 +66,14 @@ if db_password != 'NOT_SET':
         print(f"   [ERROR] Password encoding failed: {e}")
         sys.exit(1)
 
-# Test psycopg2 connection
-print("\n4. Testing psycopg2 connection...")
+# Test psycopg connection
+print("\n4. Testing psycopg connection...")
 try:
-    import psycopg2
-    print(f"   psycopg2 version: {psycopg2.__version__}")
+    import psycopg
+    print(f"   psycopg version: {psycopg.__version__}")
 
     # Connect
-    conn = psycopg2.connect(
+    conn = psycopg.connect(
         dbname=db_name,
         user=db_user,
         password=db_password,
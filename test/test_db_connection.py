@@ -76,10 +76,10 @@ for key, value in db_config.items():
     else:
         print(f"   {key}: {value}")
 
-# 4. 测试psycopg2连接
-print("\n4. 测试psycopg2直接连接...")
+# 4. 测试psycopg连接
+print("\n4. 测试psycopg直接连接...")
 try:
-    import psycopg2
+    import psycopg
 
     # 构建连接参数
     conn_params = {
@@ -93,8 +93,8 @@ try:
 
     print(f"   连接参数: dbname={conn_params['dbname']}, user={conn_params['user']}, host={conn_params['host']}, port={conn_params['port']}")
 
-    conn = psycopg2.connect(**conn_params)
-    print("   ✓ psycopg2连接成功!")
+    conn = psycopg.connect(**conn_params)
+    print("   ✓ psycopg连接成功!")
 
     # 测试查询
     cursor = conn.cursor()
@@ -106,7 +106,7 @@ try:
     conn.close()
 
 except Exception as e:
-    print(f"   ✗ psycopg2连接失败: {e}")
+    print(f"   ✗ psycopg连接失败: {e}")
     print(f"   错误类型: {type(e).__name__}")
     import traceback
     traceback.print_exc()